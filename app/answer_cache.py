@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+from app.vectorstore import get_answer_cache_collection, get_collection
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Metadane źródeł zapisywane razem z odpowiedzią - wystarczają do sformatowania linków i walidacji
+SOURCE_METADATA_KEYS = ("page", "path", "chunk_id", "hash", "attachment")
+
+
+class SemanticAnswerCache:
+    # Odpowiedzi QA w kolekcji Chroma "qa_cache", wyszukiwane po podobieństwie pytań. Wpis jest ważny tylko wtedy,
+    # gdy wszystkie chunki, z których powstała odpowiedź, mają nadal ten sam hash w kolekcji "wiki".
+
+    def __init__(self, collection=None, wiki_collection=None, threshold: float = ANSWER_CACHE_SIMILARITY,
+                 ttl_seconds: Optional[float] = ANSWER_CACHE_TTL_SECONDS):
+        self.collection = collection if collection is not None else get_answer_cache_collection()
+        self.wiki_collection = wiki_collection if wiki_collection is not None else get_collection()
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def sources_current(self, sources: List[dict]) -> bool:
+        # Bez źródeł nie da się sprawdzić, czy odpowiedź jest aktualna - traktujemy ją jak nieaktualną
+        if not sources or any(not source.get("hash") for source in sources):
+            return False
+        hashes = list({source["hash"] for source in sources})
+        found = self.wiki_collection.get(where={"hash": {"$in": hashes}}, include=["metadatas"])
+        return {metadata.get("hash") for metadata in found["metadatas"]} >= set(hashes)
+
+    def lookup(self, question: str) -> Optional[dict]:
+        if self.collection.count() == 0:
+            self.misses += 1
+            return None
+
+        result = self.collection.query(query_texts=[question], n_results=1, include=["metadatas", "distances"])
+        if not result["ids"][0]:
+            self.misses += 1
+            return None
+
+        entry_id = result["ids"][0][0]
+        metadata = result["metadatas"][0][0]
+        similarity = 1.0 - result["distances"][0][0]
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        sources = json.loads(metadata["sources"])
+        expired = self.ttl_seconds is not None and time.time() - metadata["created_at"] > self.ttl_seconds
+        if expired or not self.sources_current(sources):
+            # Wiki zmieniła się od czasu odpowiedzi - usuwamy wpis, żeby następne pytanie poszło pełną ścieżką
+            self.collection.delete(ids=[entry_id])
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {"question": metadata["question"], "answer": metadata["answer"], "sources": sources,
+                "similarity": similarity}
+
+    def store(self, question: str, answer: str, source_metadatas: List[dict]):
+        sources = [
+            {key: metadata[key] for key in SOURCE_METADATA_KEYS if key in metadata}
+            for metadata in source_metadatas
+        ]
+        if not sources:
+            return
+        entry_id = f"qa_{hashlib.sha256(' '.join(question.split()).casefold().encode('utf-8')).hexdigest()[:16]}"
+        self.collection.upsert(
+            ids=[entry_id],
+            documents=[question],
+            metadatas=[{
+                "question": question,
+                "answer": answer,
+                "sources": json.dumps(sources, ensure_ascii=False),
+                "created_at": time.time(),
+            }],
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": self.collection.count(),
+        }
+
+
+@lru_cache
+def get_answer_cache() -> SemanticAnswerCache:
+    return SemanticAnswerCache()
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import re
+from typing import List
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+CHUNK_SIZE = 1000
+
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=200,
+    separators=["\n\n", "\n", " ", ""],
+)
+
+# Formatowanie tekstu w Redmine (Administracja -> Ustawienia -> Formatowanie tekstu): textile, markdown, common_mark
+WIKI_TEXT_FORMATTING = os.getenv("WIKI_TEXT_FORMATTING", "textile").lower()
+# Nagłówki Textile (h2. Tytuł) i Markdown (## Tytuł) - każda sekcja zaczyna nowy chunk. W Textile "# punkt"
+# to lista numerowana, więc "#" jest nagłówkiem tylko w wiki Markdown.
+TEXTILE_HEADING_REGEX = re.compile(r"h[1-6]\.\s")
+MARKDOWN_HEADING_REGEX = re.compile(r"#{1,6}\s")
+PRE_OPEN_REGEX = re.compile(r"<pre\b", re.IGNORECASE)
+PRE_CLOSE_REGEX = re.compile(r"</pre>", re.IGNORECASE)
+CODE_FENCE_REGEX = re.compile(r"(`{3,}|~{3,})")
+PARAGRAPH_REGEX = re.compile(r"\n\s*\n")
+# Średnio co który akapit wypada granica zależna od treści; krótszych chunków nie tniemy
+CONTENT_BOUNDARY_DIVISOR = 4
+MIN_CHUNK_SIZE = CHUNK_SIZE // 4
+
+
+def is_content_boundary(paragraph: str) -> bool:
+    digest = hashlib.sha256(paragraph.strip().encode("utf-8")).digest()
+    return digest[0] % CONTENT_BOUNDARY_DIVISOR == 0
+
+
+def split_headings(text: str, markup: str = WIKI_TEXT_FORMATTING) -> List[str]:
+    # Dzieli tekst przed każdym nagłówkiem, pomijając linie wewnątrz <pre> i bloków ``` / ~~~
+    heading_regex = TEXTILE_HEADING_REGEX if markup == "textile" else MARKDOWN_HEADING_REGEX
+    sections = []
+    current = []
+    in_pre = False
+    fence = None
+    for line in text.splitlines(keepends=True):
+        stripped = line.lstrip()
+        if fence is None and not in_pre and heading_regex.match(line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+
+        if fence is not None:
+            if stripped.startswith(fence):
+                fence = None
+        elif in_pre:
+            if PRE_CLOSE_REGEX.search(line):
+                in_pre = False
+        else:
+            opening_fence = CODE_FENCE_REGEX.match(stripped) if markup != "textile" else None
+            opening_pre = PRE_OPEN_REGEX.search(line)
+            if opening_fence:
+                fence = opening_fence.group(1)
+            elif opening_pre and not PRE_CLOSE_REGEX.search(line, opening_pre.end()):
+                in_pre = True
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def split_anchored_chunks(text: str, chunk_size: int = CHUNK_SIZE, markup: str = WIKI_TEXT_FORMATTING) -> List[str]:
+    # Granice chunków zależą tylko od lokalnej treści: nagłówki, akapity "kotwice" wybrane po hashu
+    # i limit rozmiaru. Wstawienie akapitu przesuwa granice najwyżej do najbliższej kotwicy,
+    # więc reszta strony zachowuje te same chunki.
+    chunks = []
+    for section in split_headings(text, markup):
+        current = []
+        current_size = 0
+        for paragraph in PARAGRAPH_REGEX.split(section):
+            if not paragraph.strip():
+                continue
+            if len(paragraph) > chunk_size:
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_size = [], 0
+                chunks.extend(text_splitter.split_text(paragraph))
+                continue
+            if current and current_size + len(paragraph) + 2 > chunk_size:
+                chunks.append("\n\n".join(current))
+                current, current_size = [], 0
+            current.append(paragraph)
+            current_size += len(paragraph) + 2
+            if current_size >= MIN_CHUNK_SIZE and is_content_boundary(paragraph):
+                chunks.append("\n\n".join(current))
+                current, current_size = [], 0
+        if current:
+            chunks.append("\n\n".join(current))
+    return chunks
+
+
+def content_chunk_ids(prefix: str, chunks: List[str]) -> List[str]:
+    # Id wynika z treści, nie z pozycji - powtórzony chunk na tej samej stronie dostaje kolejny numer
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(f"{prefix}_{digest}" if occurrence == 0 else f"{prefix}_{digest}_{occurrence}")
+    return ids
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.code_ranking import IdentifierIndex
+from app.code_sections import CODE_INDEX_WORKERS, extract_section_spans, read_section, run_in_pool, scan_sections
+
+INDEX_VERSION = 5
+INDEX_FILE_NAME = "code_index.json"
+
+
+class CodeIndex:
+    # Trwały indeks sekcji (offsety bajtowe) i funkcji (zakresy linii) dla plików z CODE_DIR. Plik jest
+    # skanowany ponownie tylko wtedy, gdy zmienił się jego mtime albo rozmiar; treść sekcji czytamy przez mmap.
+
+    def __init__(self, code_dir: str, index_path: Optional[str] = None, workers: int = CODE_INDEX_WORKERS):
+        self.code_dir = code_dir
+        self.workers = workers
+        self.index_path = index_path or os.path.join(code_dir, INDEX_FILE_NAME)
+        self.files: Dict[str, dict] = {}
+        self.function_records: Optional[List[dict]] = None
+        self.identifier_index: Optional[IdentifierIndex] = None
+        # Indeks jest współdzielony przez wyszukiwanie, katalog symboli i indeks wektorowy. Słowniki plików
+        # i listy rekordów nie są modyfikowane w miejscu: nowe budujemy obok i podmieniamy jednym przypisaniem.
+        self.lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load code index {self.index_path}: {e}")
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data.get("files", {})
+
+    def save(self, files: Dict[str, dict]):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": files}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def list_files(self) -> Dict[str, os.stat_result]:
+        found = {}
+        for root, _, files in os.walk(self.code_dir):
+            for file in files:
+                # Pomijamy własne artefakty (indeks, models_data.json, others_data.json)
+                if file.endswith((".json", ".tmp")):
+                    continue
+                full_path = os.path.join(root, file)
+                try:
+                    found[full_path] = os.stat(full_path)
+                except OSError as e:
+                    print(f"Cannot stat {full_path}: {e}")
+        return found
+
+    def refresh(self) -> bool:
+        with self.lock:
+            current = self.list_files()
+            files = {full_path: entry for full_path, entry in self.files.items() if full_path in current}
+            changed = len(files) != len(self.files)
+
+            # Zmienione pliki dzielimy na sekcje i parsujemy równolegle - jedna sekcja to jedno zadanie
+            tasks = []
+            owners = []
+            for full_path, stat in current.items():
+                entry = files.get(full_path)
+                if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                    continue
+                print(f"Indexing {full_path}")
+                try:
+                    sections = scan_sections(full_path)
+                except (OSError, ValueError) as e:
+                    print(f"Cannot read {full_path}: {e}")
+                    sections = []
+                files[full_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "sections": sections}
+                for section in sections:
+                    section["functions"] = []
+                    tasks.append((full_path, section["start"], section["end"], section["line"]))
+                    owners.append(section)
+                changed = True
+
+            for section, spans in zip(owners, run_in_pool(extract_section_spans, tasks, self.workers)):
+                section["functions"] = spans
+
+            if changed:
+                self.save(files)
+                self.files = files
+                self.function_records = None
+                self.identifier_index = None
+            return changed
+
+    def sections(self) -> Iterator[Tuple[str, dict]]:
+        # Iterujemy po migawce - refresh podmienia self.files, a nie zmienia go w trakcie
+        files = self.files
+        for full_path, entry in files.items():
+            for section in entry["sections"]:
+                yield full_path, section
+
+    def section_source(self, full_path: str, section: dict) -> str:
+        return read_section(full_path, section["start"], section["end"])
+
+    def functions(self) -> List[dict]:
+        # Rekordy funkcji trzymamy w pamięci razem z treścią zapisaną małymi literami,
+        # żeby dopasowanie słów kluczowych nie robiło lower() przy każdym pytaniu
+        with self.lock:
+            if self.function_records is not None:
+                return self.function_records
+            records = []
+            for full_path, section in self.sections():
+                if not section["functions"]:
+                    continue
+                lines = self.section_source(full_path, section).splitlines()
+                for function in section["functions"]:
+                    # Numery linii są liczone od początku pliku, a lines zaczyna się od pierwszej linii sekcji
+                    snippet = "\n".join(lines[function["start"] - section["line"] - 1:function["end"] - section["line"]])
+                    records.append({
+                        "file": full_path,
+                        "section": section["name"],
+                        "function_name": function["name"],
+                        "line_number": function["start"],
+                        "end_line": function["end"],
+                        "body_line": function["body"],
+                        "snippet": snippet,
+                        "snippet_lower": snippet.lower(),
+                    })
+            self.function_records = records
+            return records
+
+    def ranking(self) -> IdentifierIndex:
+        with self.lock:
+            if self.identifier_index is None:
+                self.identifier_index = IdentifierIndex(self.functions())
+            return self.identifier_index
+
+
+@lru_cache
+def get_code_index(code_dir: str) -> CodeIndex:
+    return CodeIndex(code_dir)
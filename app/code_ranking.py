@@ -0,0 +1,94 @@
+import math
+import re
+from typing import Dict, List, Tuple
+
+IDENTIFIER_REGEX = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+CAMEL_CASE_REGEX = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+# Trafienie w nazwie funkcji waży więcej niż w sygnaturze, a to więcej niż w treści
+FIELD_WEIGHTS = {"name": 3.0, "signature": 2.0, "body": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def identifier_terms(identifier: str) -> List[str]:
+    # "Order.total_amount" -> order.total_amount, order, total_amount, total, amount
+    terms = [identifier.lower()]
+    parts = identifier.split(".")
+    if len(parts) > 1:
+        terms.extend(part.lower() for part in parts)
+    for part in parts:
+        words = [word for word in part.split("_") if word]
+        if len(words) > 1:
+            terms.extend(word.lower() for word in words)
+        for word in words:
+            camel_words = CAMEL_CASE_REGEX.findall(word)
+            if len(camel_words) > 1:
+                terms.extend(camel_word.lower() for camel_word in camel_words)
+    return terms
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    for identifier in IDENTIFIER_REGEX.findall(text):
+        terms.extend(identifier_terms(identifier))
+    return terms
+
+
+class IdentifierIndex:
+    # Odwrócony indeks: termin -> [(funkcja, ważona liczba wystąpień)], z ocenianiem BM25.
+    # Zapytanie dotyka tylko list dla swoich terminów, a nie wszystkich funkcji.
+
+    def __init__(self, functions: List[dict]):
+        self.functions = functions
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self.lengths: List[float] = []
+
+        for doc, function in enumerate(functions):
+            snippet = function["snippet"]
+            signature, _, body = snippet.partition("\n")
+            weighted: Dict[str, float] = {}
+            for field, text in (("name", function["function_name"]), ("signature", signature), ("body", body)):
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    weighted[term] = weighted.get(term, 0.0) + weight
+            for term, frequency in weighted.items():
+                self.postings.setdefault(term, []).append((doc, frequency))
+            self.lengths.append(sum(weighted.values()))
+
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def idf(self, term: str) -> float:
+        document_frequency = len(self.postings.get(term, ()))
+        count = len(self.functions)
+        return math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, keywords: List[str], top_k: int) -> List[Tuple[float, dict]]:
+        keywords = [keyword.strip() for keyword in dict.fromkeys(keywords) if keyword.strip()]
+        term_keywords: Dict[str, set] = {}
+        for number, keyword in enumerate(keywords):
+            for term in identifier_terms(keyword):
+                term_keywords.setdefault(term, set()).add(number)
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, set] = {}
+        for term, owners in term_keywords.items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc, frequency in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / self.average_length)
+                scores[doc] = scores.get(doc, 0.0) + len(owners) * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                matched.setdefault(doc, set()).update(owners)
+
+        # Funkcje pasujące do większej liczby słów kluczowych idą wyżej (jak "coord" w Lucene)
+        for doc in scores:
+            scores[doc] *= len(matched[doc]) / len(keywords)
+
+        # Remisy rozstrzygamy plikiem i numerem linii, żeby wynik był zawsze taki sam
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], self.functions[item[0]]["file"], self.functions[item[0]]["line_number"])
+        )
+        return [(score, self.functions[doc]) for doc, score in ranked[:top_k]]
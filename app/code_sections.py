@@ -0,0 +1,140 @@
+import ast
+import hashlib
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+SECTION_HEADER_REGEX = re.compile(rb'#---\s*\n#(.+\.py)\s*\n#---')
+CODE_INDEX_WORKERS = int(os.getenv("CODE_INDEX_WORKERS") or 0) or os.cpu_count() or 1
+# Przy kilku sekcjach start procesów kosztuje więcej niż samo parsowanie
+MIN_PARALLEL_TASKS = 8
+
+
+def scan_sections(full_path: str) -> List[dict]:
+    # Zrzut kodu to pliki sklejone z nagłówkami "#---\n#ścieżka.py\n#---". Plik czytamy przez mmap i zapisujemy
+    # tylko offsety bajtowe sekcji, numer linii, od której sekcja się zaczyna, i skrót jej treści;
+    # plik bez nagłówków to jedna sekcja bez nazwy.
+    with open(full_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            matches = list(SECTION_HEADER_REGEX.finditer(mm))
+            if not matches:
+                return [{"name": None, "start": 0, "end": len(mm), "line": 0, "hash": section_hash(mm, 0, len(mm))}]
+
+            sections = []
+            line = 0
+            position = 0
+            for i, match in enumerate(matches):
+                start_index = match.end()
+                end_index = matches[i + 1].start() if i + 1 < len(matches) else len(mm)
+                line += mm[position:start_index].count(b"\n")
+                position = start_index
+                sections.append({
+                    "name": match.group(1).decode("utf-8", errors="replace"),
+                    "start": start_index,
+                    "end": end_index,
+                    "line": line,
+                    "hash": section_hash(mm, start_index, end_index),
+                })
+            return sections
+
+
+def section_hash(mm: mmap.mmap, start: int, end: int) -> str:
+    return hashlib.sha1(mm[start:end]).hexdigest()
+
+
+def read_section(full_path: str, start: int, end: int) -> str:
+    # Wycinamy z mmap tylko jedną sekcję zamiast wczytywać cały zrzut
+    with open(full_path, "rb") as f:
+        # Plik mógł zostać skrócony po zbudowaniu indeksu - wtedy sekcji już nie ma, a mmap pustego pliku zawodzi
+        if start >= end or os.fstat(f.fileno()).st_size < end:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[start:end].decode("utf-8", errors="replace")
+
+
+def extract_function_spans(source: str, line_offset: int = 0) -> List[dict]:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        print(f"Cannot parse source: {e}")
+        return []
+
+    spans = []
+    lines = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            func_start = node.lineno - 1
+            func_end = getattr(node, 'end_lineno', None)
+
+            if func_end is None:
+                # fallback if Python < 3.8 — use indentation trick
+                lines = lines if lines is not None else source.splitlines()
+                for i, line in enumerate(lines[func_start + 1:], 1):
+                    if line.strip() and not line.startswith((" ", "\t")):
+                        func_end = func_start + i
+                        break
+                if func_end is None:
+                    func_end = len(lines)
+
+            # Pierwsza linia ciała wyznacza koniec sygnatury przy przycinaniu fragmentu
+            spans.append({"name": node.name, "start": line_offset + func_start + 1, "end": line_offset + func_end,
+                          "body": line_offset + node.body[0].lineno})
+    return spans
+
+
+def extract_section_spans(task: Tuple[str, int, int, int]) -> List[dict]:
+    # Worker dostaje tylko ścieżkę i offsety - sam czyta swoją sekcję, więc treść nie jest przesyłana między procesami
+    full_path, start, end, line_offset = task
+    return extract_function_spans(read_section(full_path, start, end), line_offset)
+
+
+def extract_section_models(task: Tuple[str, int, int]) -> dict:
+    full_path, start, end = task
+    return extract_from_section(read_section(full_path, start, end))
+
+
+def extract_from_section(source):
+    models_info = {}
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        print(f"Cannot parse source: {e}")
+        return models_info
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    model_name = node.name
+                    fields = []
+                    methods = []
+
+                    for sub_node in ast.iter_child_nodes(node):
+                        if isinstance(sub_node, ast.Assign):
+                            for target in sub_node.targets:
+                                if isinstance(target, ast.Name):
+                                    fields.append(target.id)
+                        elif isinstance(sub_node, ast.FunctionDef):
+                            methods.append(sub_node.name)
+
+                    models_info[model_name] = {
+                        'fields': fields,
+                        'methods': methods
+                    }
+    return models_info
+
+
+def run_in_pool(function: Callable, tasks: list, workers: int = CODE_INDEX_WORKERS) -> list:
+    # ast.parse trzyma GIL, więc sekcje parsujemy w osobnych procesach; wyniki wracają w kolejności zadań.
+    # "spawn" zamiast fork - serwer ma działające wątki, a workery importują tylko ten lekki moduł.
+    if workers <= 1 or len(tasks) < MIN_PARALLEL_TASKS:
+        return [function(task) for task in tasks]
+
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(function, tasks, chunksize=chunksize))
@@ -0,0 +1,114 @@
+import os
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+from app.chunking import content_chunk_ids
+from app.code_index import CodeIndex, get_code_index
+from app.code_ranking import tokenize
+from app.keyword_matcher import KeywordMatcher
+from app.vectorstore import get_code_collection
+
+CODE_VECTOR_SEARCH = os.getenv("CODE_VECTOR_SEARCH", "false").lower() in ("1", "true", "yes")
+CODE_VECTOR_TOP_K = int(os.getenv("CODE_VECTOR_TOP_K", "40"))
+CODE_CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "100"))
+# Krótsze terminy pytania ("do", "id") trafiałyby w prawie każdą linię kodu
+QUESTION_TERM_MIN_LENGTH = 3
+
+
+def function_document(function: dict) -> str:
+    # Ścieżka z nagłówka sekcji i nazwa funkcji trafiają do embeddingu razem z kodem
+    location = function["section"] or os.path.basename(function["file"])
+    return f"# {location} :: {function['function_name']}\n{function['snippet']}"
+
+
+def question_matcher(question: str) -> KeywordMatcher:
+    # Terminy pytania pełnią rolę słów kluczowych: wyznaczają trafienia, wokół których przycinamy fragmenty
+    return KeywordMatcher([term for term in tokenize(question) if len(term) >= QUESTION_TERM_MIN_LENGTH])
+
+
+class CodeVectorIndex:
+    # Funkcje z CODE_DIR jako osobna kolekcja Chroma "code". Id dokumentu wynika z treści funkcji,
+    # więc po zmianie zrzutu embedujemy tylko nowe lub zmienione funkcje, a przesunięte dostają nowe metadane.
+
+    def __init__(self, code_index: CodeIndex, collection=None, batch_size: int = CODE_CHROMA_BATCH_SIZE):
+        self.code_index = code_index
+        self.collection = collection if collection is not None else get_code_collection()
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.synced_functions: Optional[List[dict]] = None
+
+    def sync(self) -> dict:
+        with self.lock:
+            self.code_index.refresh()
+            functions = self.code_index.functions()
+            # Lista rekordów jest podmieniana tylko przy zmianie indeksu - bez zmian nie pytamy Chromy
+            if functions is self.synced_functions:
+                return {"added": 0, "updated": 0, "deleted": 0}
+
+            documents = [function_document(function) for function in functions]
+            ids = content_chunk_ids("code", documents)
+            metadatas = [{
+                "file": function["file"],
+                "function_name": function["function_name"],
+                "line_number": function["line_number"],
+                "end_line": function["end_line"],
+                "body_line": function["body_line"],
+            } for function in functions]
+
+            existing = self.collection.get(include=["metadatas"])
+            existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+
+            new = [index for index, doc_id in enumerate(ids) if doc_id not in existing_metadata]
+            moved = [
+                index for index, doc_id in enumerate(ids)
+                if doc_id in existing_metadata and existing_metadata[doc_id] != metadatas[index]
+            ]
+            current = set(ids)
+            stale = [doc_id for doc_id in existing_metadata if doc_id not in current]
+
+            for start in range(0, len(new), self.batch_size):
+                batch = new[start:start + self.batch_size]
+                self.collection.upsert(
+                    ids=[ids[index] for index in batch],
+                    documents=[documents[index] for index in batch],
+                    metadatas=[metadatas[index] for index in batch],
+                )
+            for start in range(0, len(moved), self.batch_size):
+                batch = moved[start:start + self.batch_size]
+                self.collection.update(
+                    ids=[ids[index] for index in batch],
+                    metadatas=[metadatas[index] for index in batch],
+                )
+            for start in range(0, len(stale), self.batch_size):
+                self.collection.delete(ids=stale[start:start + self.batch_size])
+
+            self.synced_functions = functions
+            return {"added": len(new), "updated": len(moved), "deleted": len(stale)}
+
+    def search(self, question: str, matcher: KeywordMatcher, top_k: int = CODE_VECTOR_TOP_K) -> List[dict]:
+        # Wyniki w tym samym formacie co search_functions_with_keywords; kolekcję synchronizuje wcześniej wywołujący
+        result = self.collection.query(
+            query_texts=[question], n_results=top_k, include=["metadatas", "documents", "distances"]
+        )
+        matches = []
+        for document, metadata, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0]):
+            snippet = document.split("\n", 1)[1] if "\n" in document else document
+            keyword_hits = matcher.match(snippet.lower())
+            matches.append({
+                "file": metadata["file"],
+                "function_name": metadata["function_name"],
+                "line_number": metadata["line_number"],
+                "end_line": metadata["end_line"],
+                "body_line": metadata.get("body_line"),
+                "snippet": snippet,
+                "found_keywords": list(keyword_hits),
+                "keyword_hits": keyword_hits,
+                "score": 1.0 - distance,
+            })
+        return matches
+
+
+@lru_cache
+def get_code_vector_index(code_dir: str) -> CodeVectorIndex:
+    return CodeVectorIndex(get_code_index(code_dir))
@@ -1,11 +1,21 @@
 import ast
+import asyncio
+import os
+from contextlib import suppress
 from typing import List, Dict
 
-from app.codebase_parser import search_functions_with_keywords, extract_and_save_model_data
-from app.keywords_extraction import extract_vars_chain, match_question_to_code_chain, o3_mini_llm
+from app.code_vectors import CODE_VECTOR_SEARCH
+from app.codebase_parser import search_functions_by_vector, search_functions_with_keywords, extract_and_save_model_data
+from app.keywords_extraction import LLM_CALL_TIMEOUT, extract_vars_chain, o3_mini_llm
+from app.llm_cache import ainvoke_cached, get_llm_cache
+from app.name_matching import amatch_question_to_names
+from app.snippets import get_snippet_normalizer
+from app.variable_extraction import get_variable_extractor
 
 from app.utils import send_log_to_slack
 
+ANSWER_TIMEOUT = float(os.getenv("ANSWER_TIMEOUT", "300"))
+
 
 class CodebaseRetriever:
 
@@ -13,44 +23,31 @@ class CodebaseRetriever:
         self.question = question
 
     def run(self):
-        send_log_to_slack(f"Processing question: {self.question}")
-
-        model_names, other_names = extract_and_save_model_data()
+        asyncio.run(self.arun())
 
-        send_log_to_slack(f"Extracting optional variables from question: {self.question}")
-        returned_vars = extract_vars_chain.run(question=self.question).strip()
-        variables = ast.literal_eval(returned_vars)
-
-        matching_models = []
-        matching_other = []
-
-        if not variables:
-            send_log_to_slack("Variables not found, searching for keywords in database terms")
-            matching_models = ast.literal_eval(match_question_to_code_chain.run(codebase=", ".join(model_names),
-                                                                                question=self.question).strip())
+    async def arun(self):
+        send_log_to_slack(f"Processing question: {self.question}")
 
-            matching_other = ast.literal_eval(match_question_to_code_chain.run(codebase=", ".join(other_names),
-                                                                               question=self.question).strip())
+        if CODE_VECTOR_SEARCH:
+            send_log_to_slack("Searching code vectors...")
+            results = await asyncio.to_thread(search_functions_by_vector, self.question)
         else:
-            send_log_to_slack(f"Found following variables: {', '.join(variables)}")
+            results = await self.asearch_by_keywords()
+        # Do promptu trafia tylko tyle fragmentów, ile mieści się w budżecie tokenów
+        all_snippets, packing = get_snippet_normalizer().pack(results)
+        if results:
+            send_log_to_slack(
+                f"Context: {packing['snippets']} snippets, {packing['tokens']}/{packing['budget']} tokens "
+                f"({packing['trimmed']} trimmed, {packing['skipped']} skipped)"
+            )
 
-        matching_names = matching_models + matching_other + variables
-
-        matching_names = [name.split('.')[1] if '.' in name else name for name in matching_names]
-
-        send_log_to_slack(f"Found following fields and methods in codebase: {', '.join(matching_names)}")
-
-        send_log_to_slack(f"Searching for code...")
-        results = search_functions_with_keywords(matching_names)
-        all_snippets = []
-        for entry in results:
-            all_snippets.append(entry["snippet"])
+        send_log_to_slack(f"LLM cache: {get_llm_cache().stats()}")
 
         if not all_snippets:
             send_log_to_slack("No matches found.")
         else:
             send_log_to_slack(f"Found {len(results)} matches - generating response")
-            final_answer = self.answer_with_context(all_snippets)
+            final_answer = await self.aanswer_with_context(all_snippets)
             send_log_to_slack(f"Question: {self.question}")
             send_log_to_slack(f"LLM response: {final_answer}")
             # messages = [
@@ -85,7 +82,58 @@ class CodebaseRetriever:
             #     print("\n🧠 Odpowiedź (follow-up):")
             #     print(followup_answer)
 
-    def answer_with_context(self, snippets):
+    async def asearch_by_keywords(self):
+        catalogue = await asyncio.to_thread(extract_and_save_model_data)
+        model_names, other_names = catalogue
+
+        # Nazwy z "." lub "_" znane z katalogu rozpoznajemy lokalnie; LLM pytamy tylko, gdy nic nie znaleziono
+        variables = get_variable_extractor(catalogue).extract(self.question)
+        match_task = None
+        if not variables:
+            send_log_to_slack(f"Extracting optional variables from question: {self.question}")
+            # Dopasowanie nazw nie zależy od wyniku ekstrakcji zmiennych, więc startuje od razu równolegle;
+            # jeśli zmienne się znajdą, niepotrzebne wywołania są anulowane
+            match_task = asyncio.create_task(amatch_question_to_names(self.question, [model_names, other_names]))
+            try:
+                variables = await self.aextract_variables()
+            except BaseException:
+                match_task.cancel()
+                raise
+
+        matching_models = []
+        matching_other = []
+
+        if not variables:
+            send_log_to_slack("Variables not found, searching for keywords in database terms")
+            matching_models, matching_other = await match_task
+        else:
+            if match_task is not None:
+                match_task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await match_task
+            send_log_to_slack(f"Found following variables: {', '.join(variables)}")
+
+        matching_names = matching_models + matching_other + variables
+
+        matching_names = [name.split('.')[1] if '.' in name else name for name in matching_names]
+
+        send_log_to_slack(f"Found following fields and methods in codebase: {', '.join(matching_names)}")
+
+        send_log_to_slack(f"Searching for code...")
+        return await asyncio.to_thread(search_functions_with_keywords, matching_names)
+
+    async def aextract_variables(self):
+        try:
+            return await ainvoke_cached(extract_vars_chain, {"question": self.question}, ast.literal_eval)
+        except asyncio.TimeoutError:
+            send_log_to_slack(f"Variable extraction timed out after {LLM_CALL_TIMEOUT:.0f}s")
+            return []
+
+    async def aanswer_with_context(self, snippets):
+        response = await asyncio.wait_for(o3_mini_llm.ainvoke(self.answer_prompt(snippets)), ANSWER_TIMEOUT)
+        return response.content.strip()
+
+    def answer_prompt(self, snippets):
         combined_snippets = "\n\n---\n\n".join([s for s in snippets])
 
         prompt = f"""
@@ -119,9 +167,7 @@ class CodebaseRetriever:
 
     Answer in polish:
     """
-
-        response = o3_mini_llm.invoke(prompt)
-        return response.content.strip()
+        return prompt
 
     def answer_with_context_and_history(self,
             messages: List[Dict[str, str]],
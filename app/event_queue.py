@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+from functools import lru_cache
+from typing import Callable, Optional
+
+from app.logging_config import logger
+
+EVENT_WORKERS = int(os.getenv("SLACK_EVENT_WORKERS", "4"))
+EVENT_QUEUE_SIZE = int(os.getenv("SLACK_EVENT_QUEUE_SIZE", "50"))
+EVENT_JOB_TIMEOUT = float(os.getenv("SLACK_EVENT_JOB_TIMEOUT", "300"))
+# Ile ostatnich pomiarów czasu oczekiwania i wykonania trzymamy do percentyli
+METRICS_WINDOW = 500
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class EventJob:
+
+    def __init__(self, name: str, function: Callable, on_result: Optional[Callable] = None,
+                 on_timeout: Optional[Callable] = None):
+        self.name = name
+        self.function = function
+        self.on_result = on_result
+        self.on_timeout = on_timeout
+        self.enqueued_at = time.monotonic()
+
+
+class EventQueue:
+    # Ograniczona kolejka zadań ze Slacka obsługiwana przez stałą pulę wątków. Endpoint tylko dodaje zadanie
+    # i od razu odpowiada; przy pełnej kolejce zadanie jest odrzucane, a nie blokuje. Zadanie zwraca wynik,
+    # a worker przekazuje go do on_result tylko wtedy, gdy zdążyło w limicie czasu. Wątku nie da się przerwać,
+    # więc po przekroczeniu limitu worker odrzuca wynik i czeka na koniec zadania, zanim weźmie następne -
+    # w toku nigdy nie ma więcej zadań niż workerów.
+
+    def __init__(self, workers: int = EVENT_WORKERS, max_queue: int = EVENT_QUEUE_SIZE,
+                 job_timeout: float = EVENT_JOB_TIMEOUT):
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slack-event-job")
+        self.lock = threading.Lock()
+        self.counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "timed_out": 0}
+        self.active = 0
+        self.wait_times = deque(maxlen=METRICS_WINDOW)
+        self.run_times = deque(maxlen=METRICS_WINDOW)
+        self.result_times = deque(maxlen=METRICS_WINDOW)
+        self.threads = [
+            threading.Thread(target=self.run, name=f"slack-event-worker-{number}", daemon=True)
+            for number in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, name: str, function: Callable, on_result: Optional[Callable] = None,
+               on_timeout: Optional[Callable] = None) -> bool:
+        try:
+            self.queue.put_nowait(EventJob(name, function, on_result, on_timeout))
+        except queue.Full:
+            with self.lock:
+                self.counters["rejected"] += 1
+            logger.warning(f"Slack event queue full, rejected {name} (depth {self.queue.qsize()})")
+            return False
+        with self.lock:
+            self.counters["submitted"] += 1
+        return True
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            waited = time.monotonic() - job.enqueued_at
+            with self.lock:
+                self.active += 1
+                self.wait_times.append(waited)
+
+            started = time.monotonic()
+            outcome = "completed"
+            future = self.executor.submit(job.function)
+            try:
+                result = future.result(timeout=self.job_timeout)
+            except TimeoutError:
+                outcome = "timed_out"
+                future.cancel()
+                self.notify(job.name, job.on_timeout)
+            except Exception:
+                outcome = "failed"
+                logger.exception(f"Slack event job {job.name} failed")
+            else:
+                self.notify(job.name, job.on_result, result)
+
+            # Czas do wyniku (albo do limitu) i czas zajęcia slotu różnią się tylko dla porzuconych zadań
+            answered = time.monotonic() - started
+            if not future.done():
+                # Wynik i tak nie zostanie użyty, ale slot zwalniamy dopiero po zakończeniu zadania
+                wait([future])
+            elapsed = time.monotonic() - started
+            with self.lock:
+                self.active -= 1
+                self.counters[outcome] += 1
+                self.run_times.append(elapsed)
+                self.result_times.append(answered)
+            logger.info(
+                f"Slack event job {job.name} {outcome}: waited {waited:.2f}s, answered {answered:.2f}s, "
+                f"ran {elapsed:.2f}s, queue depth {self.queue.qsize()}, active {self.active}/{self.workers}"
+            )
+            self.queue.task_done()
+
+    @staticmethod
+    def notify(name: str, callback: Optional[Callable], *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception(f"Result handler for {name} failed")
+
+    def stats(self) -> dict:
+        with self.lock:
+            wait_times = list(self.wait_times)
+            run_times = list(self.run_times)
+            result_times = list(self.result_times)
+            return {
+                **self.counters,
+                "queue_depth": self.queue.qsize(),
+                "queue_size": self.queue.maxsize,
+                "active": self.active,
+                "workers": self.workers,
+                "wait_seconds_avg": sum(wait_times) / len(wait_times) if wait_times else 0.0,
+                "wait_seconds_p95": percentile(wait_times, 0.95),
+                "wait_seconds_max": max(wait_times, default=0.0),
+                "run_seconds_avg": sum(run_times) / len(run_times) if run_times else 0.0,
+                "run_seconds_p95": percentile(run_times, 0.95),
+                "result_seconds_avg": sum(result_times) / len(result_times) if result_times else 0.0,
+                "result_seconds_p95": percentile(result_times, 0.95),
+            }
+
+
+@lru_cache
+def get_event_queue() -> EventQueue:
+    return EventQueue()
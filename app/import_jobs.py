@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Optional
+
+from app.logging_config import logger
+from app.utils import send_log_to_slack
+from app.wiki_importer import ImportCancelled, WikiImporter, INCREMENTAL_IMPORT
+
+# Co ile godzin pełny import (0 wyłącza) - tylko on wychwytuje zmiany samych załączników
+FULL_IMPORT_INTERVAL_HOURS = float(os.getenv("WIKI_FULL_IMPORT_INTERVAL_HOURS", "24"))
+SCHEDULER_CHECK_SECONDS = 600
+
+
+class ImportProgress:
+
+    def __init__(self):
+        self.pages_total = 0
+        self.pages_done = 0
+        self.chunks_embedded = 0
+        self.started_at = time.monotonic()
+
+    def eta_seconds(self) -> Optional[float]:
+        if not self.pages_done or self.pages_done >= self.pages_total:
+            return None
+        elapsed = time.monotonic() - self.started_at
+        return elapsed / self.pages_done * (self.pages_total - self.pages_done)
+
+    def describe(self) -> str:
+        eta = self.eta_seconds()
+        eta_text = f", ETA {int(eta // 60)}m {int(eta % 60)}s" if eta is not None else ""
+        return (f"{self.pages_done}/{self.pages_total} pages, "
+                f"{self.chunks_embedded} chunks embedded{eta_text}")
+
+
+class ImportJob:
+
+    def __init__(self, incremental: bool, requested_by: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.incremental = incremental
+        self.requested_by = [requested_by]
+        self.progress = ImportProgress()
+        self.cancel_event = threading.Event()
+        self.status = "running"
+        self.error = None
+        self.thread = None
+
+    def run(self):
+        try:
+            WikiImporter(progress=self.progress, cancel_event=self.cancel_event).run(incremental=self.incremental)
+            self.status = "finished"
+        except ImportCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.exception(f"Wiki import job {self.id} failed")
+            send_log_to_slack(f"❗ Wiki import failed: {e}. The next run resumes from the last checkpoint.")
+
+    def describe(self) -> str:
+        mode = "incremental" if self.incremental else "full"
+        text = f"Import {self.id} ({mode}) {self.status}: {self.progress.describe()}"
+        if self.error:
+            text += f" — {self.error}"
+        return text
+
+
+class ImportJobManager:
+    # Jeden import naraz: kolejne wywołania /reimport dołączają do trwającego zadania zamiast startować nowe.
+    # Zadanie działa w osobnym wątku, więc worker web pozostaje responsywny.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current_job = None
+        self.scheduler = None
+
+    def start(self, requested_by: str, incremental: bool = INCREMENTAL_IMPORT) -> tuple:
+        with self.lock:
+            job = self.current_job
+            if job is not None and job.status == "running":
+                job.requested_by.append(requested_by)
+                return job, False
+
+            job = ImportJob(incremental=incremental, requested_by=requested_by)
+            job.thread = threading.Thread(target=job.run, name=f"wiki-import-{job.id}", daemon=True)
+            self.current_job = job
+            job.thread.start()
+            return job, True
+
+    def cancel(self) -> Optional[ImportJob]:
+        with self.lock:
+            job = self.current_job
+            if job is None or job.status != "running":
+                return None
+            job.cancel_event.set()
+            return job
+
+    def status(self) -> Optional[ImportJob]:
+        return self.current_job
+
+    def start_scheduler(self, interval_hours: float = FULL_IMPORT_INTERVAL_HOURS):
+        if interval_hours <= 0 or self.scheduler is not None:
+            return
+        self.scheduler = threading.Thread(
+            target=self.schedule_full_imports, args=(interval_hours * 3600,), name="wiki-import-scheduler", daemon=True
+        )
+        self.scheduler.start()
+
+    def schedule_full_imports(self, interval_seconds: float):
+        # Bez zapisanego pełnego importu liczymy od startu aplikacji, żeby restart nie uruchamiał od razu pełnego importu
+        next_run = (WikiImporter.last_full_import() or time.time()) + interval_seconds
+        while True:
+            time.sleep(max(0.0, min(next_run - time.time(), SCHEDULER_CHECK_SECONDS)))
+            last_full = WikiImporter.last_full_import()
+            if last_full is not None and last_full + interval_seconds > next_run:
+                # W międzyczasie ktoś uruchomił /reimport full
+                next_run = last_full + interval_seconds
+            if time.time() < next_run:
+                continue
+            job, started = self.start(requested_by="scheduler", incremental=False)
+            if started:
+                logger.info(f"Scheduled full wiki import {job.id} started")
+                next_run = time.time() + interval_seconds
+
+
+@lru_cache
+def get_import_job_manager() -> ImportJobManager:
+    return ImportJobManager()
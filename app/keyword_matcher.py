@@ -0,0 +1,80 @@
+from collections import deque
+from typing import Dict, List
+
+# Od tej liczby słów kluczowych automat Aho-Corasick jest szybszy niż osobne str.count dla każdego słowa
+AUTOMATON_MIN_KEYWORDS = 64
+
+
+class KeywordMatcher:
+    # Dopasowuje wiele słów kluczowych naraz do tekstu zapisanego już małymi literami.
+    # Zwraca {słowo kluczowe: liczba wystąpień} w jednym przejściu po tekście.
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.by_pattern: Dict[str, List[str]] = {}
+        for keyword in self.keywords:
+            pattern = keyword.lower()
+            if pattern:
+                self.by_pattern.setdefault(pattern, []).append(keyword)
+        self.patterns = list(self.by_pattern)
+        self.transitions = None
+        if len(self.patterns) >= AUTOMATON_MIN_KEYWORDS:
+            self.build_automaton()
+
+    def build_automaton(self):
+        goto = [{}]
+        outputs = [()]
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    goto.append({})
+                    outputs.append(())
+                    next_state = goto[state][char] = len(goto) - 1
+                state = next_state
+            outputs[state] += (pattern,)
+
+        # Funkcja przejść liczona wszerz; każde przejście jest pełne (DFA), więc przy
+        # wyszukiwaniu nie cofamy się po linkach porażki
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0) if state else 0
+                outputs[next_state] += outputs[fail[next_state]]
+                queue.append(next_state)
+
+        self.transitions = transitions
+        self.outputs = outputs
+
+    def count_patterns(self, text_lower: str) -> Dict[str, int]:
+        if self.transitions is None:
+            return {pattern: text_lower.count(pattern) for pattern in self.patterns if pattern in text_lower}
+
+        transitions = self.transitions
+        outputs = self.outputs
+        # Liczymy jak str.count: wystąpienia danego słowa nie mogą na siebie nachodzić
+        counts = {}
+        next_start = {}
+        state = 0
+        for index, char in enumerate(text_lower, 1):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for pattern in outputs[state]:
+                    if index - len(pattern) >= next_start.get(pattern, 0):
+                        counts[pattern] = counts.get(pattern, 0) + 1
+                        next_start[pattern] = index
+        return counts
+
+    def match(self, text_lower: str) -> Dict[str, int]:
+        hits = {}
+        for pattern, count in self.count_patterns(text_lower).items():
+            for keyword in self.by_pattern[pattern]:
+                hits[keyword] = count
+        # Kolejność jak w liście słów kluczowych
+        return {keyword: hits[keyword] for keyword in self.keywords if keyword in hits}
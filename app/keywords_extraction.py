@@ -1,3 +1,4 @@
+import os
 from typing import Dict, Any
 
 from langchain.chains.llm import LLMChain
@@ -18,6 +19,8 @@ class ChatOpenAIWithoutTemperature(ChatOpenAI):
 o3_mini_llm = ChatOpenAIWithoutTemperature(
     model="o3-mini-2025-01-31",
 )
+# Limit czasu pojedynczego wywołania łańcucha w ścieżce asynchronicznej (sekundy)
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
 #
 # gpt4_llm = ChatOpenAI(
 #     model="gpt-4",
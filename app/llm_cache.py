@@ -0,0 +1,50 @@
+import asyncio
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Callable
+
+from app.disk_cache import DiskLRUCache
+from app.keywords_extraction import LLM_CALL_TIMEOUT
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "chroma_store/llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+@lru_cache
+def get_llm_cache():
+    return DiskLRUCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+
+
+def normalize_input(value) -> str:
+    # Wielkość liter i białe znaki nie zmieniają odpowiedzi łańcuchów dopasowujących nazwy
+    return " ".join(str(value).split()).casefold()
+
+
+def llm_cache_key(chain, inputs: dict) -> str:
+    # Lista nazw z katalogu jest częścią wejścia, więc po zmianie kodu powstaje nowy klucz,
+    # a stare wpisy wygasają z TTL albo wypadają z LRU
+    payload = json.dumps({
+        "template": chain.prompt.template,
+        "model": getattr(chain.llm, "model_name", ""),
+        "inputs": {name: hashlib.sha256(normalize_input(value).encode("utf-8")).hexdigest()
+                   for name, value in inputs.items()},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def ainvoke_cached(chain, inputs: dict, parse: Callable, timeout: float = LLM_CALL_TIMEOUT):
+    # Odpowiedź zapisujemy dopiero wtedy, gdy parse ją przyjął - błędne odpowiedzi nie trafiają do cache
+    cache = get_llm_cache()
+    key = llm_cache_key(chain, inputs)
+    cached = cache.get(key)
+    if cached is not None:
+        return parse(cached.decode("utf-8"))
+
+    result = await asyncio.wait_for(chain.ainvoke(inputs), timeout)
+    text = result["text"].strip()
+    value = parse(text)
+    cache.set(key, text.encode("utf-8"))
+    return value
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Request, BackgroundTasks
 import uuid
 
+from app.import_jobs import get_import_job_manager
 from app.vectorstore import get_collection
 from app.routers import slack_events, slack_commands
 from app.middleware import SlackSignatureMiddleware
@@ -12,6 +13,13 @@ app.include_router(slack_commands.router)
 app.add_middleware(SlackSignatureMiddleware)
 8
 
+
+@app.on_event("startup")
+def start_import_scheduler():
+    # Okresowy pełny import nadrabia zmiany samych załączników, których tryb przyrostowy nie widzi
+    get_import_job_manager().start_scheduler()
+
+
 @app.get("/")
 def hello():
     return {"message": "Hello, world!"}
@@ -0,0 +1,128 @@
+import ast
+import asyncio
+import difflib
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from app.code_ranking import identifier_terms
+from app.keywords_extraction import LLM_CALL_TIMEOUT, match_question_to_code_chain
+from app.llm_cache import ainvoke_cached
+from app.vectorstore import get_token_encoding
+
+SHORTLIST_MAX_NAMES = int(os.getenv("SHORTLIST_MAX_NAMES", "1500"))
+MATCH_SHARD_MAX_TOKENS = int(os.getenv("MATCH_SHARD_MAX_TOKENS", "6000"))
+MATCH_CONCURRENCY = int(os.getenv("MATCH_CONCURRENCY", "4"))
+FUZZY_CUTOFF = 0.8
+QUESTION_TERM_REGEX = re.compile(r"\w{3,}")
+
+
+class NameShortlist:
+    # Lokalny filtr katalogu "Klasa.pole": odwrócony indeks terminów z nazw (snake_case i CamelCase rozbite na
+    # słowa) plus dopasowanie rozmyte terminów pytania do słownika. Nazwy z trafieniami idą na początek krótkiej
+    # listy, a resztę miejsc wypełnia dalsza część katalogu - pytania są po polsku, nazwy po angielsku, więc
+    # przypadkowe trafienie jednego słowa nie może odciąć nazw, które LLM dopasowałby po tłumaczeniu.
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.postings: Dict[str, List[int]] = {}
+        for position, name in enumerate(names):
+            for term in set(identifier_terms(name)):
+                self.postings.setdefault(term, []).append(position)
+        # Dopasowanie rozmyte tylko do pojedynczych słów - pełnych identyfikatorów jest tyle, ile nazw
+        self.vocabulary = [term for term in self.postings if term.isalpha()]
+
+    def shortlist(self, question: str, limit: int = SHORTLIST_MAX_NAMES) -> List[str]:
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(QUESTION_TERM_REGEX.findall(question.lower())):
+            matched = {term: 2.0} if term in self.postings else {}
+            for close in difflib.get_close_matches(term, self.vocabulary, n=5, cutoff=FUZZY_CUTOFF):
+                if close not in matched:
+                    matched[close] = difflib.SequenceMatcher(None, term, close).ratio()
+            for close, weight in matched.items():
+                for position in self.postings[close]:
+                    scores[position] = scores.get(position, 0.0) + weight
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))[:limit]
+        selected = set(ranked)
+        for position in range(len(self.names)):
+            if len(selected) >= limit:
+                break
+            selected.add(position)
+        # Kolejność jak w katalogu, żeby ten sam zestaw nazw dawał ten sam prompt
+        return [self.names[position] for position in sorted(selected)]
+
+
+shortlists: Dict[int, NameShortlist] = {}
+shortlists_lock = threading.Lock()
+
+
+def get_name_shortlist(names: List[str]) -> NameShortlist:
+    # Listy nazw z SymbolCatalogue są podmieniane w całości przy przebudowie, więc wystarczy tożsamość obiektu
+    with shortlists_lock:
+        cached = shortlists.get(id(names))
+        if cached is None or cached.names is not names:
+            if len(shortlists) > 8:
+                shortlists.clear()
+            cached = shortlists[id(names)] = NameShortlist(names)
+        return cached
+
+
+def shard_names(names: List[str], max_tokens: int = MATCH_SHARD_MAX_TOKENS) -> List[List[str]]:
+    encoding = get_token_encoding("o3-mini")
+    shards = []
+    shard, shard_tokens = [], 0
+    for name in names:
+        # +1 na separator ", "
+        tokens = len(encoding.encode(name, disallowed_special=())) + 1
+        if shard and shard_tokens + tokens > max_tokens:
+            shards.append(shard)
+            shard, shard_tokens = [], 0
+        shard.append(name)
+        shard_tokens += tokens
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def parse_matched_names(returned: str) -> List[str]:
+    return [name for name in ast.literal_eval(returned) if isinstance(name, str)]
+
+
+def build_match_jobs(question: str, catalogues: List[List[str]]) -> List[Tuple[int, List[str]]]:
+    # Katalog mieszczący się w SHORTLIST_MAX_NAMES idzie do LLM w całości; większy zawężamy lokalnie do tylu nazw.
+    # Wszystko dzielimy na części ograniczone liczbą tokenów, więc liczba zapytań nie rośnie z wielkością kodu.
+    jobs = []
+    for catalogue_number, names in enumerate(catalogues):
+        candidates = names if len(names) <= SHORTLIST_MAX_NAMES else get_name_shortlist(names).shortlist(question)
+        for shard in shard_names(candidates):
+            jobs.append((catalogue_number, shard))
+    return jobs
+
+
+async def amatch_shard(question: str, shard: List[str], semaphore: asyncio.Semaphore,
+                       timeout: float = LLM_CALL_TIMEOUT) -> List[str]:
+    async with semaphore:
+        try:
+            return await ainvoke_cached(
+                match_question_to_code_chain, {"codebase": ", ".join(shard), "question": question},
+                parse_matched_names, timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Name matching timed out after {timeout}s ({len(shard)} names)")
+        except (ValueError, SyntaxError, TypeError) as e:
+            print(f"Cannot parse matched names: {e}")
+        return []
+
+
+async def amatch_question_to_names(question: str, catalogues: List[List[str]]) -> List[List[str]]:
+    # Części wszystkich katalogów dopasowujemy równolegle (najwyżej MATCH_CONCURRENCY naraz) i scalamy wyniki
+    jobs = await asyncio.to_thread(build_match_jobs, question, catalogues)
+    semaphore = asyncio.Semaphore(MATCH_CONCURRENCY)
+    results = await asyncio.gather(*(amatch_shard(question, shard, semaphore) for _, shard in jobs))
+
+    matched = [[] for _ in catalogues]
+    for (catalogue_number, _), names in zip(jobs, results):
+        matched[catalogue_number].extend(names)
+    return [list(dict.fromkeys(names)) for names in matched]
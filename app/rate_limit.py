@@ -0,0 +1,74 @@
+import re
+import threading
+import time
+from typing import Mapping, Optional
+
+DURATION_PART_REGEX = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    # OpenAI zwraca czas do resetu limitu w formacie "1s", "6m0s", "20ms"
+    if not value:
+        return None
+    parts = DURATION_PART_REGEX.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimiter:
+    # Wspólny limiter dla wszystkich równoległych zapytań: śledzi pozostałe RPM/TPM z nagłówków
+    # x-ratelimit-* i wstrzymuje nowe zapytania do resetu okna albo do końca Retry-After po 429
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.paused_until = 0.0
+
+    def acquire(self, tokens: int):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if self.remaining_requests is not None and self.remaining_requests < 1:
+                    wait = max(wait, self.requests_reset_at - now)
+                if self.remaining_tokens is not None and self.remaining_tokens < tokens:
+                    wait = max(wait, self.tokens_reset_at - now)
+                if wait <= 0:
+                    break
+                self.condition.wait(wait)
+
+            if self.remaining_requests is not None:
+                if now >= self.requests_reset_at:
+                    self.remaining_requests = None
+                else:
+                    self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                if now >= self.tokens_reset_at:
+                    self.remaining_tokens = None
+                else:
+                    self.remaining_tokens -= tokens
+
+    def update(self, headers: Mapping[str, str]):
+        now = time.monotonic()
+        with self.condition:
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            if remaining_requests is not None:
+                self.remaining_requests = int(remaining_requests)
+                self.requests_reset_at = now + (parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 0)
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                self.remaining_tokens = int(remaining_tokens)
+                self.tokens_reset_at = now + (parse_reset_duration(headers.get("x-ratelimit-reset-tokens")) or 0)
+            self.condition.notify_all()
+
+    def pause(self, seconds: float):
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -2,29 +2,48 @@ from fastapi import APIRouter, Request, BackgroundTasks
 from fastapi.responses import JSONResponse
 import requests
 
+from app.answer_cache import get_answer_cache
 from app.codebase_retriever import CodebaseRetriever
+from app.event_queue import get_event_queue
+from app.import_jobs import FULL_IMPORT_INTERVAL_HOURS, get_import_job_manager
 from app.logging_config import logger
-from app.wiki_importer import WikiImporter
 
 router = APIRouter()
 
 @router.post("/slack/commands/reimport")
-async def trigger_import(request: Request, background_tasks: BackgroundTasks):
+async def trigger_import(request: Request):
     form = await request.form()
     payload = dict(form)
     logger.info(f"Received Slack command: {payload}")
 
     user = payload.get("user_id")
     response_url = payload.get("response_url")
+    command = payload.get("text", "").strip().lower()
+    manager = get_import_job_manager()
 
-    logger.info("Triggering WikiImporter via Slack command")
-    background_tasks.add_task(WikiImporter().run)
+    if command == "status":
+        job = manager.status()
+        text = job.describe() if job else "Import Wiki nie był jeszcze uruchamiany."
+    elif command == "cancel":
+        job = manager.cancel()
+        text = f"Przerywam import {job.id} (<@{user}>)" if job else "Żaden import nie jest w toku."
+    else:
+        incremental = command != "full"
+        logger.info(f"Triggering WikiImporter via Slack command (incremental: {incremental})")
+        job, started = manager.start(requested_by=user, incremental=incremental)
+        if started:
+            text = f"Import Wiki został uruchomiony przez <@{user}>"
+            if incremental:
+                # Redmine nie zmienia updated_on ani wersji strony przy zmianie samych załączników
+                schedule = f" albo automatycznie co {FULL_IMPORT_INTERVAL_HOURS:g} h" if FULL_IMPORT_INTERVAL_HOURS > 0 else ""
+                text += (" (przyrostowo: zmiany samych załączników trafią do wiki dopiero przy pełnym imporcie"
+                         f" — `/reimport full`{schedule})")
+        else:
+            text = f"Import Wiki już trwa — dołączono do zadania {job.id}: {job.progress.describe()}"
 
     if response_url:
         logger.info(f"Sending confirmation via response_url (user: {user})")
-        requests.post(response_url, json={
-            "text": f"Import Wiki został uruchomiony przez <@{user}>"
-        })
+        requests.post(response_url, json={"text": text})
 
     return JSONResponse(content={"status": "ok"})
 
@@ -40,6 +59,35 @@ async def search_text(request: Request, background_tasks: BackgroundTasks):
     if not query:
         return {"error": "Missing 'query' parameter"}
 
-    background_tasks.add_task(CodebaseRetriever(query).run)
+    background_tasks.add_task(CodebaseRetriever(query).arun)
+
+    return JSONResponse(content={"status": "ok"})
+
+
+@router.post("/slack/commands/event_stats")
+async def event_stats(request: Request):
+    # Głębokość kolejki i czasy oczekiwania - do doboru SLACK_EVENT_WORKERS pod obciążeniem.
+    # Jako komenda Slacka przechodzi przez weryfikację podpisu jak pozostałe endpointy.
+    form = await request.form()
+    payload = dict(form)
+    logger.info(f"Received Slack command: {payload}")
+
+    queue = get_event_queue().stats()
+    cache = get_answer_cache().stats()
+    text = (
+        f"Kolejka: {queue['queue_depth']}/{queue['queue_size']}, aktywne {queue['active']}/{queue['workers']}, "
+        f"przyjęte {queue['submitted']}, odrzucone {queue['rejected']}, zakończone {queue['completed']}, "
+        f"błędy {queue['failed']}, przekroczony czas {queue['timed_out']}\n"
+        f"Oczekiwanie: śr. {queue['wait_seconds_avg']:.2f}s, p95 {queue['wait_seconds_p95']:.2f}s, "
+        f"max {queue['wait_seconds_max']:.2f}s; zajęcie workera: śr. {queue['run_seconds_avg']:.2f}s, "
+        f"p95 {queue['run_seconds_p95']:.2f}s; do odpowiedzi: śr. {queue['result_seconds_avg']:.2f}s, "
+        f"p95 {queue['result_seconds_p95']:.2f}s\n"
+        f"Cache odpowiedzi: {cache['hits']} trafień, {cache['misses']} chybień "
+        f"({cache['hit_rate']:.0%}), {cache['size']} wpisów"
+    )
+
+    response_url = payload.get("response_url")
+    if response_url:
+        requests.post(response_url, json={"text": text})
 
     return JSONResponse(content={"status": "ok"})
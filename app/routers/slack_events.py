@@ -1,3 +1,4 @@
+import asyncio
 import os
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
@@ -5,12 +6,47 @@ from fastapi.responses import JSONResponse
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+from app.answer_cache import ANSWER_CACHE_ENABLED, get_answer_cache
+from app.event_queue import get_event_queue
 from app.logging_config import logger
 from app.state import seen_slack_events
 from app.utils import get_qa_chain
 
 router = APIRouter()
 
+
+def post_message(channel: str, text: str):
+    slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+    try:
+        slack.chat_postMessage(channel=channel, text=text)
+    except SlackApiError as e:
+        logger.error(f"Slack error: {e.response['error']}")
+
+
+def answer_mention(question: str) -> str:
+    # Podobne pytanie z aktualnymi źródłami w wiki - odpowiedź z cache bez retrievera i LLM
+    cached = get_answer_cache().lookup(question) if ANSWER_CACHE_ENABLED else None
+    if cached:
+        logger.info(f"Answer cache hit ({cached['similarity']:.3f}): {cached['question']}")
+        answer = cached["answer"]
+        sources = cached["sources"]
+    else:
+        result = get_qa_chain()({"query": question})
+        answer = result["result"]
+        sources = [doc.metadata for doc in result.get("source_documents", [])]
+        if ANSWER_CACHE_ENABLED:
+            get_answer_cache().store(question, answer, sources)
+
+    formatted_sources = [
+        f"<{os.getenv('REDMINE_WIKI_BASE_URL')}{source.get('page').replace(' ', '_')}|{source.get('path')} (chunk {source.get('chunk_id')})>"
+        for source in sources
+    ]
+
+    sources_block = "\n".join(formatted_sources) if formatted_sources else "_sources_missing_"
+
+    return f"*📥 {question}*\n\n{answer}\n\n📚 *Sources:*\n{sources_block}"
+
+
 @router.post("/slack/events")
 async def handle_slack_events(request: Request):
     payload = await request.json()
@@ -36,24 +72,17 @@ async def handle_slack_events(request: Request):
 
             logger.info(f"Slack mention → question: {question}")
 
-            result = get_qa_chain()({"query": question})
-            answer = result["result"]
-            sources = result.get("source_documents", [])
-
-            formatted_sources = [
-                f"<{os.getenv('REDMINE_WIKI_BASE_URL')}{doc.metadata.get('page').replace(' ', '_')}|{doc.metadata.get('path')} (chunk {doc.metadata.get('chunk_id')})>"
-                for doc in sources
-            ]
-
-            sources_block = "\n".join(formatted_sources) if formatted_sources else "_sources_missing_"
-
-            slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
-            try:
-                slack.chat_postMessage(
-                    channel=channel,
-                    text=f"*📥 {question}*\n\n{answer}\n\n📚 *Sources:*\n{sources_block}"
+            # Slack czeka na odpowiedź najwyżej 3 sekundy - potwierdzamy od razu, a pytanie trafia do kolejki.
+            # Odpowiedź wysyła worker i tylko wtedy, gdy zadanie zdążyło przed limitem czasu.
+            accepted = get_event_queue().submit(
+                name=f"mention {event_id}",
+                function=lambda: answer_mention(question),
+                on_result=lambda text: post_message(channel, text),
+                on_timeout=lambda: post_message(channel, f"*📥 {question}*\n\n⏱️ Nie udało się przygotować odpowiedzi na czas."),
+            )
+            if not accepted:
+                await asyncio.to_thread(
+                    post_message, channel, f"*📥 {question}*\n\n⏳ Zbyt wiele pytań naraz — spróbuj ponownie za chwilę."
                 )
-            except SlackApiError as e:
-                logger.error(f"Slack error: {e.response['error']}")
 
     return JSONResponse(content={"ok": True})
@@ -0,0 +1,158 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+SLACK_LOG_CHANNEL = os.getenv("SLACK_LOG_CHANNEL", "#gawel-log")
+SLACK_LOG_FLUSH_INTERVAL = float(os.getenv("SLACK_LOG_FLUSH_INTERVAL", "5"))
+SLACK_LOG_QUEUE_SIZE = int(os.getenv("SLACK_LOG_QUEUE_SIZE", "10000"))
+SLACK_LOG_GROUP_MAX_LINES = int(os.getenv("SLACK_LOG_GROUP_MAX_LINES", "10000"))
+SLACK_MESSAGE_MAX_CHARS = 3000
+
+
+class SlackLogSink:
+    # Logi trafiają do ograniczonej kolejki, a wątek w tle co flush_interval sekund wysyła je zbiorczo.
+    # Wiadomości z tą samą grupą (np. "➕ {count} new chunks") są sklejane w jedno podsumowanie,
+    # a szczegóły lądują w pliku w wątku. Linie grup zbieramy osobno (w kolejce jest tylko znacznik miejsca
+    # grupy), więc seria tysięcy linii grupy nie wypycha zwykłych wiadomości. Nadmiarowe linie są tylko
+    # liczone, nigdy nie blokujemy.
+
+    def __init__(self, channel: str = SLACK_LOG_CHANNEL, flush_interval: float = SLACK_LOG_FLUSH_INTERVAL,
+                 max_queue: int = SLACK_LOG_QUEUE_SIZE, max_group_lines: int = SLACK_LOG_GROUP_MAX_LINES):
+        self.channel = channel
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_group_lines = max_group_lines
+        self.groups = {}
+        self.dropped = {}
+        self.lock = threading.Lock()
+        self.slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+        self.thread = threading.Thread(target=self.run, name="slack-log-sink", daemon=True)
+        self.thread.start()
+
+    def log(self, message: str, group: Optional[str] = None):
+        if group is not None:
+            with self.lock:
+                lines = self.groups.get(group)
+                first = lines is None
+                if first:
+                    lines = self.groups[group] = []
+                if len(lines) < self.max_group_lines:
+                    lines.append(message)
+                else:
+                    self.dropped[group] = self.dropped.get(group, 0) + 1
+            if first:
+                try:
+                    self.queue.put_nowait((group, None))
+                except queue.Full:
+                    # Bez znacznika grupa trafi na koniec najbliższego wysłania
+                    pass
+            return
+
+        try:
+            self.queue.put_nowait((None, message))
+        except queue.Full:
+            with self.lock:
+                self.dropped[None] = self.dropped.get(None, 0) + 1
+
+    def run(self):
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            items = []
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self.flush(items)
+
+    def drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def flush(self, items: list):
+        with self.lock:
+            groups, self.groups = self.groups, {}
+            dropped, self.dropped = self.dropped, {}
+        if not items and not groups and not dropped:
+            return
+
+        # Zachowujemy kolejność: kolejne luźne linie sklejamy w jedną wiadomość,
+        # a każda grupa to jedno podsumowanie w miejscu swojego znacznika
+        posts = []
+        placed = set()
+        for group, message in items:
+            if group is None:
+                if posts and posts[-1][0] is None:
+                    posts[-1][1].append(message)
+                else:
+                    posts.append((None, [message]))
+            elif group in groups and group not in placed:
+                # Znacznik bez linii należy do grupy, którą wysłało już poprzednie opróżnienie
+                placed.add(group)
+                posts.append((group, groups[group]))
+        dropped_lines = dropped.pop(None, 0)
+        if dropped_lines:
+            posts.append((None, [f"… {dropped_lines} log lines dropped"]))
+        for group in list(groups) + list(dropped):
+            if group not in placed:
+                placed.add(group)
+                posts.append((group, groups.get(group, [])))
+
+        for group, messages in posts:
+            try:
+                if group is None:
+                    self.post_lines(messages)
+                else:
+                    self.post_group(group, messages, dropped.get(group, 0))
+            except SlackApiError as e:
+                print(f"Slack log error: {e.response['error']}")
+            except Exception as e:
+                print(f"Slack log error: {e}")
+
+    def post_lines(self, messages: list):
+        text = ""
+        for message in messages:
+            if text and len(text) + len(message) + 1 > SLACK_MESSAGE_MAX_CHARS:
+                self.slack.chat_postMessage(channel=self.channel, text=text)
+                text = ""
+            text = f"{text}\n{message}" if text else message
+        if text:
+            self.slack.chat_postMessage(channel=self.channel, text=text)
+
+    def post_group(self, group: str, messages: list, dropped: int):
+        summary = group.format(count=len(messages) + dropped)
+        if dropped:
+            summary += f" ({dropped} not listed)"
+        response = self.slack.chat_postMessage(channel=self.channel, text=summary)
+        if messages:
+            self.slack.files_upload_v2(
+                channel=response["channel"],
+                thread_ts=response["ts"],
+                content="\n".join(messages),
+                filename="details.txt",
+                title=summary
+            )
+
+    def close(self):
+        self.flush(self.drain())
+
+
+@lru_cache
+def get_slack_log_sink() -> SlackLogSink:
+    sink = SlackLogSink()
+    atexit.register(sink.close)
+    return sink
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.keyword_matcher import KeywordMatcher
+from app.vectorstore import get_token_encoding
+
+SNIPPET_TOKEN_MODEL = "o3-mini"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "24000"))
+CONTEXT_MAX_SNIPPET_TOKENS = int(os.getenv("CONTEXT_MAX_SNIPPET_TOKENS", "1500"))
+CONTEXT_HIT_WINDOW = int(os.getenv("CONTEXT_HIT_WINDOW", "3"))
+
+
+def snippet_hash(snippet: str) -> str:
+    return hashlib.sha1(snippet.strip().encode("utf-8")).hexdigest()
+
+
+def merge_spans(matches: List[dict], matcher: KeywordMatcher) -> Tuple[List[dict], int]:
+    # ast.walk zwraca też funkcje zagnieżdżone, więc ten sam kod trafia do wyników kilka razy.
+    # Zakresy zawarte w innych usuwamy, nachodzące na siebie sklejamy w jeden fragment.
+    merged = []
+    merged_count = 0
+    by_file = {}
+    for match in matches:
+        by_file.setdefault(match["file"], []).append(match)
+
+    for file_matches in by_file.values():
+        file_matches.sort(key=lambda match: (match["line_number"], -match["end_line"]))
+        current = None
+        for match in file_matches:
+            if current is None or match["line_number"] > current["end_line"]:
+                current = dict(match)
+                merged.append(current)
+                continue
+
+            merged_count += 1
+            current["score"] = max(current["score"], match["score"])
+            current["merged_functions"] = current.get("merged_functions", []) + [match["function_name"]]
+            if match["end_line"] > current["end_line"]:
+                overlap = current["end_line"] - match["line_number"] + 1
+                tail = match["snippet"].split("\n")[overlap:]
+                current["snippet"] = "\n".join([current["snippet"]] + tail)
+                current["end_line"] = match["end_line"]
+                current["keyword_hits"] = matcher.match(current["snippet"].lower())
+                current["found_keywords"] = list(current["keyword_hits"])
+
+    # Kolejność wyników jak w rankingu
+    merged.sort(key=lambda match: (-match["score"], match["file"], match["line_number"]))
+    return merged, merged_count
+
+
+def trim_snippet(snippet: str, keywords: List[str], signature_lines: Optional[int] = None,
+                 window: int = CONTEXT_HIT_WINDOW) -> str:
+    # Zostawiamy sygnaturę funkcji i po kilka linii wokół trafień. Długość sygnatury pochodzi z AST
+    # (linie do początku ciała); bez niej - do linii kończącej się dwukropkiem, pomijając komentarz na końcu.
+    lines = snippet.split("\n")
+    keep = set()
+    if signature_lines is not None:
+        keep.update(range(min(len(lines), max(1, signature_lines))))
+    else:
+        for number, line in enumerate(lines):
+            keep.add(number)
+            if line.split("#", 1)[0].rstrip().endswith(":"):
+                break
+
+    keywords_lower = [keyword.lower() for keyword in keywords]
+    for number, line in enumerate(lines):
+        line_lower = line.lower()
+        if any(keyword in line_lower for keyword in keywords_lower):
+            keep.update(range(max(0, number - window), min(len(lines), number + window + 1)))
+
+    trimmed = []
+    previous = -1
+    for number in sorted(keep):
+        if number > previous + 1:
+            trimmed.append("    ...")
+        trimmed.append(lines[number])
+        previous = number
+    if previous < len(lines) - 1:
+        trimmed.append("    ...")
+    return "\n".join(trimmed)
+
+
+class SnippetNormalizer:
+    # Scala nachodzące zakresy funkcji i usuwa identyczne fragmenty przed złożeniem promptu,
+    # licząc ile tokenów zaoszczędziło każde zapytanie
+
+    def __init__(self, model: str = SNIPPET_TOKEN_MODEL):
+        self.encoding = get_token_encoding(model)
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.tokens_before = 0
+        self.tokens_saved = 0
+
+    def token_count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count_tokens(self, matches: List[dict]) -> int:
+        return sum(self.token_count(match["snippet"]) for match in matches)
+
+    def normalize(self, matches: List[dict], matcher: KeywordMatcher) -> Tuple[List[dict], dict]:
+        tokens_before = self.count_tokens(matches)
+        merged, merged_count = merge_spans(matches, matcher)
+
+        unique = []
+        seen = {}
+        for match in merged:
+            key = snippet_hash(match["snippet"])
+            if key in seen:
+                seen[key]["duplicates"] = seen[key].get("duplicates", 0) + 1
+                continue
+            seen[key] = match
+            unique.append(match)
+
+        tokens_after = self.count_tokens(unique)
+        with self.lock:
+            self.queries += 1
+            self.tokens_before += tokens_before
+            self.tokens_saved += tokens_before - tokens_after
+
+        return unique, {
+            "matches": len(matches),
+            "merged_spans": merged_count,
+            "duplicates": len(merged) - len(unique),
+            "snippets": len(unique),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+        }
+
+    def pack(self, matches: List[dict], budget: int = CONTEXT_TOKEN_BUDGET,
+             max_snippet_tokens: int = CONTEXT_MAX_SNIPPET_TOKENS) -> Tuple[List[str], dict]:
+        # Zachłanne wypełnianie budżetu tokenów fragmentami od najwyżej ocenionych, żeby koszt i czas
+        # odpowiedzi miały górną granicę. Za duże funkcje przycinamy do sygnatury i okolic trafień.
+        packed = []
+        used = 0
+        trimmed_count = 0
+        skipped = 0
+        for match in sorted(matches, key=lambda match: -match["score"]):
+            snippet = match["snippet"]
+            tokens = self.token_count(snippet)
+            trimmed = tokens > max_snippet_tokens or used + tokens > budget
+            if trimmed:
+                signature_lines = (match["body_line"] - match["line_number"]
+                                   if match.get("body_line") is not None else None)
+                snippet = trim_snippet(snippet, match["found_keywords"], signature_lines)
+                tokens = self.token_count(snippet)
+            if used + tokens > budget:
+                skipped += 1
+                continue
+            packed.append(snippet)
+            used += tokens
+            trimmed_count += trimmed
+
+        return packed, {
+            "snippets": len(packed),
+            "trimmed": trimmed_count,
+            "skipped": skipped,
+            "tokens": used,
+            "budget": budget,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "tokens_before": self.tokens_before,
+            "tokens_saved": self.tokens_saved,
+            "saved_rate": self.tokens_saved / self.tokens_before if self.tokens_before else 0.0,
+        }
+
+
+@lru_cache
+def get_snippet_normalizer() -> SnippetNormalizer:
+    return SnippetNormalizer()
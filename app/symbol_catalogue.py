@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.code_index import get_code_index
+from app.code_sections import CODE_INDEX_WORKERS, extract_section_models, run_in_pool
+from app.utils import send_log_to_slack
+
+CATALOGUE_VERSION = 1
+CATALOGUE_FILE_NAME = "symbol_catalogue.json"
+MODELS_FILE_NAME = "models_data.json"
+OTHERS_FILE_NAME = "others_data.json"
+
+
+def section_matches(section_name: Optional[str], file_name=None, skip_files=()) -> bool:
+    if section_name is None:
+        return False
+    if file_name and file_name not in section_name:
+        return False
+    elif file_name is None and section_name in skip_files:
+        return False
+    return True
+
+
+def merge_models(results: Iterable[dict]) -> dict:
+    models_info = {}
+    for models in results:
+        for model, info in models.items():
+            if model not in models_info:
+                models_info[model] = {'fields': list(info['fields']), 'methods': list(info['methods'])}
+            else:
+                models_info[model]['fields'].extend(info['fields'])
+                models_info[model]['methods'].extend(info['methods'])
+    return models_info
+
+
+def create_names_from_classes(class_info: dict):
+    names = []
+    for class_name, class_entry in class_info.items():
+        fields = class_entry['fields']
+        methods = [method for method in class_entry['methods'] if "__" not in method]
+
+        for field in fields+methods:
+            names.append(f"{class_name}.{field}")
+
+    return names
+
+
+def write_json_atomic(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class SymbolCatalogue:
+    # Katalog nazw modeli i pól (models_data.json / others_data.json) trzymany w pamięci procesu.
+    # Jest powiązany ze skrótem sekcji zrzutów kodu: przy zmianie skrótu parsujemy tylko sekcje o nowej treści,
+    # a gotowe listy podmieniamy jednym przypisaniem, więc pytanie nigdy nie widzi połowy przebudowy.
+
+    def __init__(self, code_dir: str, path: Optional[str] = None, workers: int = CODE_INDEX_WORKERS):
+        self.code_dir = code_dir
+        self.workers = workers
+        self.path = path or os.path.join(code_dir, CATALOGUE_FILE_NAME)
+        self.code_index = get_code_index(code_dir)
+        self.lock = threading.Lock()
+        self.digest: Optional[str] = None
+        self.names: Optional[Tuple[List[str], List[str]]] = None
+        self.section_models: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load symbol catalogue {self.path}: {e}")
+            return
+        if data.get("version") == CATALOGUE_VERSION:
+            self.digest = data["digest"]
+            self.names = (data["model_names"], data["other_names"])
+            self.section_models = data["sections"]
+
+    def save(self):
+        model_names, other_names = self.names
+        write_json_atomic(self.path, {
+            "version": CATALOGUE_VERSION,
+            "digest": self.digest,
+            "model_names": model_names,
+            "other_names": other_names,
+            "sections": self.section_models,
+        })
+        # Pliki w dotychczasowym formacie zostają dla narzędzi, które je czytają
+        write_json_atomic(os.path.join(self.code_dir, MODELS_FILE_NAME), model_names)
+        write_json_atomic(os.path.join(self.code_dir, OTHERS_FILE_NAME), other_names)
+
+    def dump_sections(self) -> List[Tuple[str, dict]]:
+        return [
+            (full_path, section) for full_path, section in self.code_index.sections()
+            if full_path.endswith('.txt') and section["name"] is not None
+        ]
+
+    @staticmethod
+    def compute_digest(sections: List[Tuple[str, dict]]) -> str:
+        digest = hashlib.sha256()
+        for full_path, section in sections:
+            digest.update(f"{full_path}\0{section['name']}\0{section['hash']}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self) -> Tuple[List[str], List[str]]:
+        # Sprawdzenie aktualności to tylko stat plików w CODE_DIR; treść czytamy wyłącznie dla zmienionych sekcji
+        with self.lock:
+            self.code_index.refresh()
+            sections = self.dump_sections()
+            digest = self.compute_digest(sections)
+            if self.names is None or digest != self.digest:
+                self.rebuild(sections, digest)
+            return self.names
+
+    def rebuild(self, sections: List[Tuple[str, dict]], digest: str):
+        tasks = {}
+        for full_path, section in sections:
+            if section["hash"] not in self.section_models and section["hash"] not in tasks:
+                tasks[section["hash"]] = (full_path, section["start"], section["end"])
+        send_log_to_slack(f"Building codebase data ({len(tasks)} of {len(sections)} sections changed)")
+
+        for section_hash, models in zip(tasks, run_in_pool(extract_section_models, list(tasks.values()), self.workers)):
+            self.section_models[section_hash] = models
+        current = {section["hash"] for _, section in sections}
+        self.section_models = {key: value for key, value in self.section_models.items() if key in current}
+
+        classes = merge_models(
+            self.section_models[section["hash"]] for _, section in sections
+            if section_matches(section["name"], file_name="models.py")
+        )
+        other = merge_models(
+            self.section_models[section["hash"]] for _, section in sections
+            if section_matches(section["name"], skip_files=["models.py"])
+        )
+        self.names = (create_names_from_classes(classes), create_names_from_classes(other))
+        self.digest = digest
+        self.save()
+
+
+@lru_cache
+def get_symbol_catalogue(code_dir: str) -> SymbolCatalogue:
+    return SymbolCatalogue(code_dir)
@@ -1,13 +1,13 @@
 import os
 from functools import lru_cache
+from typing import Optional
 
 from langchain.chains.retrieval_qa.base import RetrievalQA
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import LLMChainExtractor
 from langchain_community.chat_models import ChatOpenAI
 from langchain_community.vectorstores import Chroma
-from slack_sdk import WebClient
-
+from app.slack_log import get_slack_log_sink
 from app.vectorstore import CustomOpenAIEmbeddings
 
 llm = ChatOpenAI(temperature=0.2, model="gpt-4o-2024-11-20")
@@ -56,9 +56,7 @@ def get_qa_chain():
 
 
 
-def send_log_to_slack(message: str):
-    slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
-    slack.chat_postMessage(
-        channel="#gawel-log",
-        text=message
-    )
+def send_log_to_slack(message: str, group: Optional[str] = None):
+    # Nie blokuje - wiadomość trafia do kolejki SlackLogSink i jest wysyłana zbiorczo w tle.
+    # Linie z tą samą grupą (np. "➕ {count} new chunks") są sklejane w jedno podsumowanie.
+    get_slack_log_sink().log(message, group)
@@ -0,0 +1,62 @@
+import re
+import threading
+from typing import Dict, List, Tuple
+
+BACKTICK_REGEX = re.compile(r"`([^`\n]+)`")
+# Tylko ASCII - polskie słowa z pytania nie są identyfikatorami
+IDENTIFIER_REGEX = re.compile(r"(?<![\w.])[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+
+def candidate_identifiers(question: str) -> List[str]:
+    # W tekście bierzemy to, co reguła z extract_vars_prompt uznaje za zmienną: nazwy z "." albo "_".
+    # W `kodzie` każdy identyfikator jest kandydatem.
+    candidates = []
+    for code in BACKTICK_REGEX.findall(question):
+        candidates.extend(IDENTIFIER_REGEX.findall(code))
+    text = BACKTICK_REGEX.sub(" ", question)
+    candidates.extend(
+        identifier for identifier in IDENTIFIER_REGEX.findall(text)
+        if "." in identifier or "_" in identifier.strip("_")
+    )
+    return list(dict.fromkeys(candidates))
+
+
+class VariableExtractor:
+    # Lokalny odpowiednik extract_vars_chain: kandydaci z pytania sprawdzani w katalogu "Klasa.pole"
+
+    def __init__(self, catalogue: Tuple[List[str], List[str]]):
+        self.catalogue = catalogue
+        self.names = set()
+        self.classes = set()
+        self.members = set()
+        for names in catalogue:
+            for name in names:
+                class_name, _, member = name.partition(".")
+                self.names.add(name.lower())
+                self.classes.add(class_name.lower())
+                self.members.add(member.lower())
+
+    def is_known(self, identifier: str) -> bool:
+        lowered = identifier.lower()
+        if lowered in self.names or lowered in self.members or lowered in self.classes:
+            return True
+        # "order.status" z instancją zamiast klasy albo dłuższy łańcuch atrybutów
+        return any(part in self.members for part in lowered.split(".")[1:])
+
+    def extract(self, question: str) -> List[str]:
+        return [identifier for identifier in candidate_identifiers(question) if self.is_known(identifier)]
+
+
+extractors: Dict[int, VariableExtractor] = {}
+extractors_lock = threading.Lock()
+
+
+def get_variable_extractor(catalogue: Tuple[List[str], List[str]]) -> VariableExtractor:
+    # SymbolCatalogue zwraca tę samą krotkę nazw aż do przebudowy
+    with extractors_lock:
+        cached = extractors.get(id(catalogue))
+        if cached is None or cached.catalogue is not catalogue:
+            if len(extractors) > 4:
+                extractors.clear()
+            cached = extractors[id(catalogue)] = VariableExtractor(catalogue)
+        return cached
@@ -1,23 +1,158 @@
 import os
+import hashlib
+import random
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+
+import openai
+import tiktoken
 from langchain_community.embeddings import OpenAIEmbeddings
 import chromadb
 
+from app.disk_cache import DiskLRUCache
+from app.rate_limit import RateLimiter, parse_reset_duration
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "chroma_store/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+EMBEDDING_BATCH_MAX_TEXTS = int(os.getenv("EMBEDDING_BATCH_MAX_TEXTS", "2048"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+
+
+@lru_cache
+def get_embedding_cache():
+    return DiskLRUCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+
+
+@lru_cache
+def get_embedding_rate_limiter():
+    return RateLimiter()
+
+
+@lru_cache
+def get_batch_client(api_key, base_url, organization, timeout):
+    # Własny klient bez wbudowanych ponowień - 429 obsługujemy sami, razem z limiterem
+    return openai.OpenAI(
+        api_key=api_key, base_url=base_url, organization=organization, timeout=timeout, max_retries=0
+    ).embeddings
+
+
+def get_token_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
 
 class CustomOpenAIEmbeddings(OpenAIEmbeddings):
 
     def __init__(self, openai_api_key, *args, **kwargs):
         super().__init__(openai_api_key=openai_api_key, *args, **kwargs)
 
+    def cache_key(self, text: str) -> str:
+        # Ten sam sha256 co WikiImporter.hash_chunk, poprzedzony nazwą modelu
+        return f"{self.model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def embed_documents(self, texts, chunk_size=0):
+        cache = get_embedding_cache()
+        keys = [self.cache_key(text) for text in texts]
+        cached = cache.get_many(keys)
+
+        # Do API trafiają tylko teksty, których embeddingu jeszcze nie mamy
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        if missing:
+            embeddings = self.embed_in_batches(list(missing.values()))
+            fresh = {key: array("f", embedding).tobytes() for key, embedding in zip(missing, embeddings)}
+            cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [array("f", cached[key]).tolist() for key in keys]
+
+    def pack_batches(self, texts):
+        # Pakujemy teksty w paczki ograniczone liczbą tokenów i liczbą wejść na jedno zapytanie.
+        # Teksty dłuższe niż kontekst modelu zwracamy osobno.
+        encoding = get_token_encoding(self.model)
+        batches, oversized = [], []
+        batch, batch_tokens = [], 0
+        for index, text in enumerate(texts):
+            tokens = len(encoding.encode(text, disallowed_special=()))
+            if tokens > self.embedding_ctx_length:
+                oversized.append(index)
+                continue
+            if batch and (batch_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS or len(batch) >= EMBEDDING_BATCH_MAX_TEXTS):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(index)
+            batch_tokens += tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches, oversized
+
+    def embed_batch(self, texts, tokens: int):
+        limiter = get_embedding_rate_limiter()
+        for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+            limiter.acquire(tokens)
+            try:
+                client = get_batch_client(
+                    self.openai_api_key, self.openai_api_base, self.openai_organization, self.request_timeout
+                )
+                raw_response = client.with_raw_response.create(input=texts, **self._invocation_params)
+            except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+                if attempt == EMBEDDING_MAX_RETRIES:
+                    raise
+                response = getattr(e, "response", None)
+                retry_after = parse_reset_duration(response.headers.get("retry-after")) if response is not None else None
+                # Wykładniczy backoff z jitterem, żeby równoległe wątki nie wracały jednocześnie
+                delay = (retry_after or 2 ** attempt) + random.uniform(0, 1)
+                print(f"Embedding request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                limiter.pause(delay)
+                time.sleep(delay)
+                continue
+            limiter.update(raw_response.headers)
+            data = sorted(raw_response.parse().data, key=lambda item: item.index)
+            return [item.embedding for item in data]
+
+    def embed_in_batches(self, texts):
+        batches, oversized = self.pack_batches(texts)
+        embeddings = [None] * len(texts)
+
+        with ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY, thread_name_prefix="embeddings") as executor:
+            results = executor.map(
+                lambda batch: self.embed_batch([texts[index] for index in batch[0]], batch[1]),
+                batches
+            )
+            for (indexes, _), batch_embeddings in zip(batches, results):
+                for index, embedding in zip(indexes, batch_embeddings):
+                    embeddings[index] = embedding
+
+        if oversized:
+            # Zbyt długie teksty trzeba pociąć i uśrednić - to robi już OpenAIEmbeddings
+            for index, embedding in zip(oversized, super().embed_documents([texts[index] for index in oversized])):
+                embeddings[index] = embedding
+
+        return embeddings
+
     def _embed_documents(self, texts):
-        return super().embed_documents(texts)  # <--- use OpenAIEmbedding's embedding function
+        return self.embed_documents(texts)  # <--- use OpenAIEmbedding's embedding function
 
     def __call__(self, input):
         return self._embed_documents(input)  # <--- get the embeddings
 
+@lru_cache
+def get_chroma_client():
+    return chromadb.PersistentClient(path="chroma_store")
+
+
 @lru_cache
 def get_collection():
-    client = chromadb.PersistentClient(path="chroma_store")
+    client = get_chroma_client()
 
     # noinspection PyTypeChecker
     return client.get_or_create_collection(
@@ -26,3 +161,31 @@ def get_collection():
             openai_api_key=os.getenv("OPENAI_API_KEY")
         )
     )
+
+
+@lru_cache
+def get_code_collection():
+    client = get_chroma_client()
+
+    # noinspection PyTypeChecker
+    return client.get_or_create_collection(
+        name="code",
+        embedding_function=CustomOpenAIEmbeddings(
+            openai_api_key=os.getenv("OPENAI_API_KEY")
+        ),
+        metadata={"hnsw:space": "cosine"}
+    )
+
+
+@lru_cache
+def get_answer_cache_collection():
+    client = get_chroma_client()
+
+    # noinspection PyTypeChecker
+    return client.get_or_create_collection(
+        name="qa_cache",
+        embedding_function=CustomOpenAIEmbeddings(
+            openai_api_key=os.getenv("OPENAI_API_KEY")
+        ),
+        metadata={"hnsw:space": "cosine"}
+    )
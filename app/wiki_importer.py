@@ -1,28 +1,70 @@
 import os
 import hashlib
+import json
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List
 
-from app.utils import send_log_to_slack
-from app.vectorstore import get_collection
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    separators=["\n\n", "\n", " ", ""],
-)
+from app.chunking import content_chunk_ids, split_anchored_chunks, text_splitter
+from app.utils import send_log_to_slack
+from app.vectorstore import get_collection, get_embedding_cache
+
+FETCH_CONCURRENCY = int(os.getenv("REDMINE_FETCH_CONCURRENCY", "8"))
+FETCH_MAX_RETRIES = int(os.getenv("REDMINE_FETCH_MAX_RETRIES", "5"))
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "100"))
+INCREMENTAL_IMPORT = os.getenv("WIKI_IMPORT_INCREMENTAL", "true").lower() == "true"
+ATTACHMENT_CACHE_DIR = os.getenv("ATTACHMENT_CACHE_DIR", "chroma_store/attachments")
+TEXT_ATTACHMENT_EXTENSIONS = (".txt", ".md", ".csv", ".json", ".xml", ".html", ".log")
+IMPORT_CHECKPOINT_PATH = os.getenv("IMPORT_CHECKPOINT_PATH", "chroma_store/import_checkpoint.json")
+CHECKPOINT_EVERY_PAGES = int(os.getenv("IMPORT_CHECKPOINT_EVERY_PAGES", "25"))
+FULL_IMPORT_STAMP_PATH = os.getenv("FULL_IMPORT_STAMP_PATH", "chroma_store/last_full_import.json")
+# "anchored" - granice na nagłówkach i akapitach, id z treści; "positional" - dawne {title}_{i}
+CHUNKING_MODE = os.getenv("WIKI_CHUNKING", "anchored")
+
+
+def create_redmine_session(api_key: str, pool_size: int = FETCH_CONCURRENCY) -> requests.Session:
+    # Jedna sesja keep-alive dla indeksu, stron i załączników; ponawiamy 429 i 5xx z backoffem
+    retry = Retry(
+        total=FETCH_MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update({"X-Redmine-API-Key": api_key or ""})
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ImportCancelled(Exception):
+    pass
 
 
 class WikiImporter:
-    def __init__(self):
+    def __init__(self, concurrency: int = FETCH_CONCURRENCY, batch_size: int = CHROMA_BATCH_SIZE,
+                 progress=None, cancel_event: threading.Event = None, collection=None):
 
         self.api_url = os.getenv("REDMINE_API_URL")
         self.api_key = os.getenv("REDMINE_API_KEY")
         self.project = os.getenv("REDMINE_PROJECT")
-        self.headers = {"X-Redmine-API-Key": self.api_key}
-        self.collection = get_collection()
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.pending_ids, self.pending_documents, self.pending_metadatas = [], [], []
+        self.pending_metadata_updates = {}
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.checkpoint_pages = []
+        self.session = create_redmine_session(self.api_key, pool_size=self.concurrency)
+        self.collection = collection if collection is not None else get_collection()
 
     @staticmethod
     def build_page_lookup(wiki_pages):
@@ -41,44 +83,93 @@ class WikiImporter:
         return " / ".join(breadcrumbs)
 
     def get_wiki_index(self) -> List[dict]:
-        r = requests.get(
-            f"{self.api_url}/projects/{self.project}/wiki/index.json",
-            headers=self.headers
-        )
+        r = self.session.get(f"{self.api_url}/projects/{self.project}/wiki/index.json")
         r.raise_for_status()
         return r.json().get("wiki_pages", [])
 
     def get_wiki_page(self, title: str) -> dict:
-        r = requests.get(
-            f"{self.api_url}/projects/{self.project}/wiki/{title}.json?include=attachments",
-            headers=self.headers
-        )
+        r = self.session.get(f"{self.api_url}/projects/{self.project}/wiki/{title}.json?include=attachments")
         r.raise_for_status()
         return r.json().get("wiki_page", {})
 
+    def get_wiki_page_with_attachments(self, title: str):
+        page_data = self.get_wiki_page(title)
+        return page_data, self.download_text_attachments(page_data)
+
+    def fetch_pages(self, wiki_pages: List[dict]):
+        # Pobieramy strony (razem z załącznikami) równolegle i oddajemy je w kolejności ukończenia,
+        # żeby dzielenie i embedding ruszyły zanim reszta stron zostanie pobrana
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="redmine-fetch") as executor:
+            futures = {
+                executor.submit(self.get_wiki_page_with_attachments, page["title"]): page
+                for page in wiki_pages
+            }
+            try:
+                for future in as_completed(futures):
+                    page_data, text_attachments = future.result()
+                    yield futures[future], page_data, text_attachments
+            finally:
+                for future in futures:
+                    future.cancel()
+
     @staticmethod
-    def download_text_attachments(wiki_page: dict, headers: dict):
+    def attachment_fingerprint(attachment: dict) -> str:
+        # Starsze wersje Redmine nie zwracają digest - wtedy wystarczy rozmiar i data dodania
+        return attachment.get("digest") or f"{attachment.get('filesize')}-{attachment.get('created_on')}"
+
+    @staticmethod
+    def attachment_cache_path(attachment_id, fingerprint: str) -> str:
+        key = f"{attachment_id}:{fingerprint}"
+        return os.path.join(ATTACHMENT_CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".txt")
+
+    @staticmethod
+    def prune_attachment_cache(keep_paths: set):
+        # Zastąpione i usunięte załączniki zostawiałyby swoje pliki w cache na zawsze
+        if not os.path.isdir(ATTACHMENT_CACHE_DIR):
+            return
+        keep_names = {os.path.basename(path) for path in keep_paths}
+        removed = 0
+        for name in os.listdir(ATTACHMENT_CACHE_DIR):
+            if name not in keep_names:
+                os.remove(os.path.join(ATTACHMENT_CACHE_DIR, name))
+                removed += 1
+        if removed:
+            print(f"Removed {removed} stale attachment cache files")
+
+    def download_attachment(self, attachment: dict) -> str:
+        cache_path = self.attachment_cache_path(attachment.get("id"), self.attachment_fingerprint(attachment))
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        print(f"Pobieram tekstowy załącznik {attachment['filename']} z {attachment['content_url']}")
+        response = self.session.get(attachment["content_url"])
+        response.raise_for_status()
+        text = response.text
+
+        os.makedirs(ATTACHMENT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+        return text
+
+    def download_text_attachments(self, wiki_page: dict) -> List[tuple]:
         attachments = wiki_page.get("attachments", [])
 
-        text_attachments = {}
+        text_attachments = []
 
-        if not attachments:
-            print("Brak załączników do pobrania.")
-        else:
-            for attachment in attachments:
-                filename = attachment.get("filename")
-                content_url = attachment.get("content_url")
-                if not filename or not content_url:
-                    continue
+        for attachment in attachments:
+            filename = attachment.get("filename")
+            content_url = attachment.get("content_url")
+            if not filename or not content_url:
+                continue
 
-                # Sprawdzamy, czy rozszerzenie wskazuje na plik tekstowy
-                if filename.lower().endswith((".txt", ".md", ".csv", ".json", ".xml", ".html", ".log")):
-                    print(f"Pobieram tekstowy załącznik {filename} z {content_url}")
-                    response = requests.get(content_url, headers=headers)
-                    response.raise_for_status()
-                    text_attachments[filename] = response.text
-                else:
-                    print(f"Pomiń załącznik {filename} - nie jest tekstowy.")
+            # Sprawdzamy, czy rozszerzenie wskazuje na plik tekstowy
+            if filename.lower().endswith(TEXT_ATTACHMENT_EXTENSIONS):
+                text_attachments.append((attachment, self.download_attachment(attachment)))
+            else:
+                print(f"Pomiń załącznik {filename} - nie jest tekstowy.")
 
         return text_attachments
 
@@ -89,109 +180,286 @@ class WikiImporter:
     def split_chunks(text: str) -> list[str]:
         return text_splitter.split_text(text)
 
-    def fetch_existing_ids(self):
-        existing_chunks = self.collection.get()
-        existing_ids = set(existing_chunks.get("ids", []))
-        return existing_ids
+    @staticmethod
+    def split_page(title: str, content: str) -> tuple:
+        if CHUNKING_MODE == "anchored":
+            chunks = split_anchored_chunks(content)
+            return chunks, content_chunk_ids(title, chunks)
+        chunks = text_splitter.split_text(content)
+        return chunks, [f"{title}_{i}" for i in range(len(chunks))]
+
+    def fetch_existing_metadata(self) -> dict:
+        # Jedno zapytanie o wszystkie id i metadane zamiast get() dla każdego chunka
+        existing_chunks = self.collection.get(include=["metadatas"])
+        return {
+            doc_id: metadata or {}
+            for doc_id, metadata in zip(existing_chunks.get("ids", []), existing_chunks.get("metadatas", []))
+        }
+
+    @staticmethod
+    def group_ids_by_page(existing: dict) -> dict:
+        ids_by_page = {}
+        for doc_id, metadata in existing.items():
+            ids_by_page.setdefault(metadata.get("page"), []).append(doc_id)
+        return ids_by_page
+
+    @staticmethod
+    def group_ids_by_attachment(existing: dict) -> dict:
+        ids_by_attachment = {}
+        for doc_id, metadata in existing.items():
+            if "attachment_id" in metadata:
+                ids_by_attachment.setdefault((metadata.get("page"), metadata["attachment_id"]), []).append(doc_id)
+        return ids_by_attachment
+
+    @staticmethod
+    def is_page_unchanged(page: dict, path: str, page_ids: List[str], existing: dict) -> bool:
+        # Strona jest aktualna, jeśli wszystkie jej chunki mają ten sam updated_on, wersję i ścieżkę co w indeksie
+        if not page_ids:
+            return False
+        for doc_id in page_ids:
+            metadata = existing[doc_id]
+            if (metadata.get("updated_at") != page.get("updated_on")
+                    or metadata.get("version") != page.get("version", 0)
+                    or metadata.get("path") != path):
+                return False
+        return True
 
     @staticmethod
     def get_chunk_with_path(chunk: str, path: str) -> str:
         return f"[{path}]\n{chunk}"
 
-    def add_to_collection(self, title: str, index: int, chunk_hash: str, updated: str, path: str,
-                          chunk_with_path: str, doc_id: str):
-        metadata = {
-            "page": title,
-            "chunk_id": index,
-            "hash": chunk_hash,
-            "updated_at": updated,
-            "path": path
-        }
-
-        self.collection.add(
-            documents=[chunk_with_path],
-            ids=[doc_id],
-            metadatas=[metadata]
+    def queue_upsert(self, doc_id: str, document: str, metadata: dict):
+        self.pending_ids.append(doc_id)
+        self.pending_documents.append(document)
+        self.pending_metadatas.append(metadata)
+        if len(self.pending_ids) >= self.batch_size:
+            self.flush_upserts()
+
+    def flush_upserts(self):
+        if not self.pending_ids:
+            return
+        self.collection.upsert(
+            ids=self.pending_ids,
+            documents=self.pending_documents,
+            metadatas=self.pending_metadatas
         )
+        if self.progress is not None:
+            self.progress.chunks_embedded += len(self.pending_ids)
+        self.pending_ids, self.pending_documents, self.pending_metadatas = [], [], []
+
+    def queue_metadata_update(self, doc_id: str, metadata: dict):
+        # Sama zmiana metadanych (np. nowy updated_on przy tej samej treści) nie wymaga ponownego embeddingu
+        self.pending_metadata_updates[doc_id] = metadata
+        if len(self.pending_metadata_updates) >= self.batch_size:
+            self.flush_metadata_updates()
+
+    def flush_metadata_updates(self):
+        if not self.pending_metadata_updates:
+            return
+        self.collection.update(
+            ids=list(self.pending_metadata_updates),
+            metadatas=list(self.pending_metadata_updates.values())
+        )
+        self.pending_metadata_updates = {}
+
+    def delete_in_batches(self, ids: List[str]):
+        for start in range(0, len(ids), self.batch_size):
+            self.collection.delete(ids=ids[start:start + self.batch_size])
+
+    @staticmethod
+    def load_checkpoint() -> dict:
+        # Strony zapisane przez przerwany (anulowany albo zabity) import, z wersją, w której je zaimportowano.
+        # Przy wznowieniu pomijamy tylko strony, które od tego czasu się nie zmieniły.
+        if not os.path.exists(IMPORT_CHECKPOINT_PATH):
+            return {}
+        try:
+            with open(IMPORT_CHECKPOINT_PATH, "r", encoding="utf-8") as f:
+                done_pages = json.load(f).get("done_pages", {})
+        except (OSError, ValueError) as e:
+            print(f"Cannot load import checkpoint {IMPORT_CHECKPOINT_PATH}: {e}")
+            return {}
+        # Stary format (sama lista tytułów) nie pozwala sprawdzić wersji - zaczynamy od nowa
+        return done_pages if isinstance(done_pages, dict) else {}
+
+    @staticmethod
+    def page_checkpoint_state(page: dict) -> list:
+        return [page["updated_on"], page.get("version", 0)]
+
+    def save_checkpoint(self, done_pages: dict):
+        # Najpierw zapisujemy wszystko z kolejki, dopiero potem oznaczamy strony jako zrobione
+        self.flush_upserts()
+        self.flush_metadata_updates()
+        for page in self.checkpoint_pages:
+            done_pages[page["title"]] = self.page_checkpoint_state(page)
+        self.checkpoint_pages = []
+
+        os.makedirs(os.path.dirname(IMPORT_CHECKPOINT_PATH) or ".", exist_ok=True)
+        tmp_path = f"{IMPORT_CHECKPOINT_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done_pages": done_pages}, f, sort_keys=True)
+        os.replace(tmp_path, IMPORT_CHECKPOINT_PATH)
 
-    def run(self):
-        send_log_to_slack("📥 Wiki import has started.")
+    @staticmethod
+    def last_full_import():
+        # Czas zakończenia ostatniego pełnego importu - tylko on wychwytuje zmiany samych załączników
+        try:
+            with open(FULL_IMPORT_STAMP_PATH, "r", encoding="utf-8") as f:
+                return json.load(f).get("finished_at")
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def save_full_import_stamp():
+        os.makedirs(os.path.dirname(FULL_IMPORT_STAMP_PATH) or ".", exist_ok=True)
+        tmp_path = f"{FULL_IMPORT_STAMP_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"finished_at": time.time()}, f)
+        os.replace(tmp_path, FULL_IMPORT_STAMP_PATH)
+
+    @staticmethod
+    def clear_checkpoint():
+        if os.path.exists(IMPORT_CHECKPOINT_PATH):
+            os.remove(IMPORT_CHECKPOINT_PATH)
+
+    def sync_chunk(self, doc_id: str, document: str, metadata: dict, existing: dict):
+        old_metadata = existing.get(doc_id)
+        if old_metadata is None:
+            print(f"➕ New chunk: {doc_id}")
+            send_log_to_slack(f"➕ New chunk: {doc_id}", group="➕ {count} new chunks")
+        elif old_metadata.get("hash") != metadata["hash"]:
+            print(f"📝 Updated chunk: {doc_id}")
+            send_log_to_slack(f"📝 Updated chunk: {doc_id}", group="📝 {count} updated chunks")
+        else:
+            if old_metadata != metadata:
+                self.queue_metadata_update(doc_id, metadata)
+            return
+        self.queue_upsert(doc_id, document, metadata)
+
+    def run(self, incremental: bool = INCREMENTAL_IMPORT):
+        send_log_to_slack(f"📥 Wiki import has started ({'incremental' if incremental else 'full'}).")
         wiki_pages = self.get_wiki_index()
         print(f"Found {len(wiki_pages)} wiki pages")
         page_lookup = self.build_page_lookup(wiki_pages)
 
-        existing_ids = self.fetch_existing_ids()
+        existing = self.fetch_existing_metadata()
+        ids_by_page = self.group_ids_by_page(existing)
+        ids_by_attachment = self.group_ids_by_attachment(existing)
 
         imported_ids = set()
+        attachment_cache_paths = set()
+        self.pending_ids, self.pending_documents, self.pending_metadatas = [], [], []
+        self.pending_metadata_updates = {}
+        self.checkpoint_pages = []
+
+        done_pages = self.load_checkpoint()
+        if done_pages:
+            print(f"Resuming import from checkpoint: {len(done_pages)} pages already imported")
 
+        pages_to_fetch = []
         for page in wiki_pages:
+            title = page["title"]
+            path = self.build_breadcrumbs(title, page_lookup)
+            page_ids = ids_by_page.get(title, [])
+            # Dodanie, podmiana czy usunięcie załącznika nie zmienia updated_on ani wersji strony, więc tryb
+            # przyrostowy ich nie widzi - nadrabia je dopiero pełny import (/reimport full albo harmonogram)
+            checkpointed = done_pages.get(title) == self.page_checkpoint_state(page)
+            if checkpointed or (incremental and self.is_page_unchanged(page, path, page_ids, existing)):
+                # Strona bez zmian - nie pobieramy jej, a jej chunki zostają w kolekcji
+                imported_ids.update(page_ids)
+                attachment_cache_paths.update(
+                    self.attachment_cache_path(existing[doc_id]["attachment_id"], existing[doc_id].get("digest"))
+                    for doc_id in page_ids if "attachment_id" in existing[doc_id]
+                )
+            else:
+                pages_to_fetch.append(page)
+        print(f"Skipping {len(wiki_pages) - len(pages_to_fetch)} unchanged pages, fetching {len(pages_to_fetch)}")
+        if self.progress is not None:
+            self.progress.pages_total = len(pages_to_fetch)
+
+        for page, page_data, text_attachments in self.fetch_pages(pages_to_fetch):
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                # Zapisujemy to, co już przetworzone; usuwanie pomijamy, bo reszta stron nie została sprawdzona
+                self.save_checkpoint(done_pages)
+                send_log_to_slack(f"⏹️ Wiki import cancelled after {len(done_pages)} pages, checkpoint saved.")
+                raise ImportCancelled()
+
             title = page["title"]
             path = self.build_breadcrumbs(title, page_lookup)
             updated = page["updated_on"]
+            version = page.get("version", 0)
 
             print(f"Importing page: {title}")
-            page_data = self.get_wiki_page(title)
             content = page_data.get("text", "")
 
-            chunks = self.split_chunks(content)
+            chunks, doc_ids = self.split_page(title, content)
 
-            for i, chunk in enumerate(chunks):
+            for i, (chunk, doc_id) in enumerate(zip(chunks, doc_ids)):
                 chunk_with_path = self.get_chunk_with_path(chunk, path)
-                chunk_hash = self.hash_chunk(chunk_with_path)
-                doc_id = f"{title}_{i}"
                 imported_ids.add(doc_id)
+                metadata = {
+                    "page": title,
+                    "chunk_id": i,
+                    "hash": self.hash_chunk(chunk_with_path),
+                    "updated_at": updated,
+                    "version": version,
+                    "path": path
+                }
+                self.sync_chunk(doc_id, chunk_with_path, metadata, existing)
+
+            # Załączniki tekstowe - tylko nowe lub zmienione są dzielone i embeddowane
+            for attachment, text_content in text_attachments:
+                filename = attachment["filename"]
+                digest = self.attachment_fingerprint(attachment)
+                attachment_cache_paths.add(self.attachment_cache_path(attachment.get("id"), digest))
+                attachment_ids = ids_by_attachment.get((title, attachment.get("id")), [])
+                if attachment_ids and all(existing[doc_id].get("digest") == digest for doc_id in attachment_ids):
+                    imported_ids.update(attachment_ids)
+                    for doc_id in attachment_ids:
+                        metadata = {**existing[doc_id], "updated_at": updated, "version": version, "path": path}
+                        if metadata != existing[doc_id]:
+                            self.queue_metadata_update(doc_id, metadata)
+                    continue
 
-                existing = self.collection.get(ids=[doc_id], include=["metadatas"])
-                if existing["ids"]:
-                    old_hash = existing["metadatas"][0].get("hash")
-                    if old_hash == chunk_hash:
-                        pass
-                    else:
-                        print(f"📝 Updated chunk: {doc_id}")
-                        send_log_to_slack(f"📝 Updated chunk: {doc_id}")
-                        self.collection.delete(ids=[doc_id])
-                        self.add_to_collection(title, i, chunk_hash, updated, path, chunk_with_path, doc_id)
-                else:
-                    print(f"➕ New chunk: {doc_id}")
-                    send_log_to_slack(f"➕ New chunk: {doc_id}")
-                    self.add_to_collection(title, i, chunk_hash, updated, path, chunk_with_path, doc_id)
-
-                # Pobieramy załączniki tekstowe
-                text_attachments = self.download_text_attachments(page_data, self.headers)
-                for filename, text_content in text_attachments.items():
-                    attachment_chunks = self.split_chunks(text_content)
-                    for j, att_chunk in enumerate(attachment_chunks):
-                        doc_id = f"{title}_attachment_{filename}_{j}"
-                        existing_attachment_ids = self.collection.get(ids=[doc_id], include=["metadatas"])
-                        if existing_attachment_ids["ids"]:
-                            continue
-                        imported_ids.add(doc_id)
-                        metadata = {
-                            "page": title,
-                            "attachment": filename,
-                            "chunk_id": j,
-                            "updated_at": updated,
-                            "path": path
-                        }
-                        print(f"➕ Dodaję fragment załącznika: {doc_id}")
-                        send_log_to_slack(f"➕ Dodaję fragment załącznika: {doc_id}")
-                        self.collection.add(
-                            documents=[att_chunk],
-                            ids=[doc_id],
-                            metadatas=[metadata]
-                        )
+                attachment_chunks = self.split_chunks(text_content)
+                for j, att_chunk in enumerate(attachment_chunks):
+                    # Id z id załącznika - na jednej stronie może być kilka plików o tej samej nazwie
+                    doc_id = f"{title}_attachment_{attachment.get('id')}_{j}"
+                    imported_ids.add(doc_id)
+                    metadata = {
+                        "page": title,
+                        "attachment": filename,
+                        "attachment_id": attachment.get("id"),
+                        "digest": digest,
+                        "chunk_id": j,
+                        "hash": self.hash_chunk(att_chunk),
+                        "updated_at": updated,
+                        "version": version,
+                        "path": path
+                    }
+                    self.sync_chunk(doc_id, att_chunk, metadata, existing)
 
             print(f"✅ Imported {len(chunks)} chunks for page: {title}")
+            self.checkpoint_pages.append(page)
+            if self.progress is not None:
+                self.progress.pages_done += 1
+            if len(self.checkpoint_pages) >= CHECKPOINT_EVERY_PAGES:
+                self.save_checkpoint(done_pages)
+
+        self.flush_upserts()
+        self.flush_metadata_updates()
 
         # Find and delete removed chunks
-        deleted_ids = existing_ids - imported_ids
+        deleted_ids = sorted(set(existing) - imported_ids)
         if deleted_ids:
             for doc_id in deleted_ids:
                 print(f"❌ Deleted chunk: {doc_id}")
-                send_log_to_slack(f"❌ Deleted chunk: {doc_id}")
-            self.collection.delete(ids=list(deleted_ids))
+                send_log_to_slack(f"❌ Deleted chunk: {doc_id}", group="❌ {count} deleted chunks")
+            self.delete_in_batches(deleted_ids)
+        self.prune_attachment_cache(attachment_cache_paths)
 
+        self.clear_checkpoint()
+        if not incremental:
+            self.save_full_import_stamp()
         print(f"🎉 Finished importing")
+        print(f"Embedding cache: {get_embedding_cache().stats()}")
         send_log_to_slack("✅ Wiki import has completed.")
-
-
@@ -0,0 +1,99 @@
+import argparse
+import random
+
+# Ile chunków trzeba ponownie embeddować po typowych edycjach strony, dla dzielenia pozycyjnego
+# (id {title}_{i}) i zakotwiczonego (nagłówki + granice zależne od treści, id z treści).
+# Uruchomienie: python -m benchmarks.chunking_churn
+
+from app.chunking import content_chunk_ids, split_anchored_chunks, text_splitter
+
+WORDS = ("faktura klient zamówienie płatność status raport użytkownik projekt termin kwota "
+         "invoice order payment user report status project deadline amount export").split()
+
+
+def make_paragraph(rng: random.Random) -> str:
+    sentences = []
+    for _ in range(rng.randint(1, 5)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def make_page(rng: random.Random, sections: int) -> list:
+    blocks = []
+    for section in range(sections):
+        blocks.append(f"h2. Sekcja {section}")
+        blocks.extend(make_paragraph(rng) for _ in range(rng.randint(2, 8)))
+    return blocks
+
+
+def edit_history(rng: random.Random, blocks: list, steps: int):
+    # Każdy krok to jedna lokalna zmiana: wstawienie, edycja lub usunięcie akapitu
+    for _ in range(steps):
+        blocks = list(blocks)
+        action = rng.choice(("insert_top", "insert", "edit", "delete"))
+        if action == "insert_top":
+            blocks.insert(1, make_paragraph(rng))
+        elif action == "insert":
+            blocks.insert(rng.randrange(1, len(blocks)), make_paragraph(rng))
+        elif action == "edit":
+            index = rng.randrange(len(blocks))
+            if not blocks[index].startswith("h2."):
+                blocks[index] = blocks[index].replace(".", " poprawka.", 1)
+        elif len(blocks) > 2:
+            blocks.pop(rng.randrange(1, len(blocks)))
+        yield action, "\n\n".join(blocks)
+
+
+def positional(title: str, text: str) -> dict:
+    chunks = text_splitter.split_text(text)
+    return {f"{title}_{i}": chunk for i, chunk in enumerate(chunks)}
+
+
+def anchored(title: str, text: str) -> dict:
+    chunks = split_anchored_chunks(text)
+    return dict(zip(content_chunk_ids(title, chunks), chunks))
+
+
+def reembedded(previous: dict, current: dict) -> int:
+    # Tak samo jak importer: nowe id albo zmieniona treść pod tym samym id
+    return sum(1 for doc_id, chunk in current.items() if previous.get(doc_id) != chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    totals = {name: {"chunks": 0, "reembedded": 0} for name in ("positional", "anchored")}
+    per_action = {}
+
+    for page in range(args.pages):
+        title = f"Page_{page}"
+        blocks = make_page(rng, args.sections)
+        previous = {name: split(title, "\n\n".join(blocks))
+                    for name, split in (("positional", positional), ("anchored", anchored))}
+        for action, text in edit_history(rng, blocks, args.steps):
+            for name, split in (("positional", positional), ("anchored", anchored)):
+                current = split(title, text)
+                changed = reembedded(previous[name], current)
+                totals[name]["chunks"] += len(current)
+                totals[name]["reembedded"] += changed
+                per_action.setdefault((name, action), []).append(changed)
+                previous[name] = current
+
+    edits = args.pages * args.steps
+    print(f"{edits} edits on {args.pages} pages")
+    for name, total in totals.items():
+        print(f"{name:<11} avg chunks/page={total['chunks'] / edits:6.1f}  "
+              f"re-embedded/edit={total['reembedded'] / edits:5.2f}")
+    for (name, action), counts in sorted(per_action.items(), key=lambda item: (item[0][1], item[0][0])):
+        print(f"  {action:<11} {name:<11} re-embedded/edit={sum(counts) / len(counts):5.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+import random
+
+# Generator syntetycznych zrzutów kodu w formacie CODE_DIR: pliki .txt z sekcjami
+# "#---\n#ścieżka.py\n#---", modele z polami i metodami (także zagnieżdżonymi funkcjami)
+
+WORDS = ("user order invoice payment status amount customer project report export "
+         "item price tax discount address contract delivery warehouse").split()
+
+
+def generate_section(rng: random.Random, path: str, classes: int) -> str:
+    lines = [f"#---\n#{path}\n#---", "import os", ""]
+    for number in range(classes):
+        class_name = f"{rng.choice(WORDS).capitalize()}{rng.choice(WORDS).capitalize()}{number}"
+        lines.append(f"class {class_name}(Model):")
+        for _ in range(4):
+            lines.append(f"    {rng.choice(WORDS)}_{rng.choice(WORDS)} = Field()")
+        for method in range(3):
+            lines.append(f"    def {rng.choice(WORDS)}_{rng.choice(WORDS)}_{method}(self, {rng.choice(WORDS)}):")
+            lines.append(f"        def inner_{method}():")
+            lines.append(f"            return self.{rng.choice(WORDS)}_{rng.choice(WORDS)}")
+            for line in range(rng.randint(3, 12)):
+                lines.append(f"        value_{line} = self.{rng.choice(WORDS)}_{rng.choice(WORDS)} + {line}")
+            lines.append(f"        return inner_{method}()")
+            lines.append("")
+    return "\n".join(lines)
+
+
+def generate_code_dir(path: str, dumps: int = 4, sections: int = 50, classes: int = 5, seed: int = 1):
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    for dump in range(dumps):
+        parts = []
+        for section in range(sections):
+            file_name = "models.py" if section % 3 == 0 else f"services_{section}.py"
+            parts.append(generate_section(rng, f"app_{dump}_{section}/{file_name}", classes))
+        with open(os.path.join(path, f"dump_{dump}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(parts) + "\n")
@@ -0,0 +1,48 @@
+import argparse
+import os
+import tempfile
+import time
+
+# Mierzy zimne budowanie indeksu funkcji i ekstrakcję modeli przy różnej liczbie procesów.
+# Uruchomienie: python -m benchmarks.code_index_build_bench --workers 1 2 4 8
+
+from app.code_index import CodeIndex
+from app.code_sections import extract_section_models, run_in_pool
+from benchmarks.code_dump import generate_code_dir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dumps", type=int, default=4)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    code_dir = tempfile.mkdtemp(prefix="code_index_bench_")
+    generate_code_dir(code_dir, dumps=args.dumps, sections=args.sections)
+    print(f"{os.cpu_count()} CPUs, {args.dumps} dumps x {args.sections} sections")
+
+    for workers in args.workers:
+        index_path = os.path.join(code_dir, f"code_index_{workers}.json")
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        started = time.perf_counter()
+        code_index = CodeIndex(code_dir, index_path=index_path, workers=workers)
+        code_index.refresh()
+        index_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        tasks = [(full_path, section["start"], section["end"]) for full_path, section in code_index.sections()]
+        models = {}
+        for result in run_in_pool(extract_section_models, tasks, workers):
+            models.update(result)
+        models_elapsed = time.perf_counter() - started
+
+        functions = sum(len(section["functions"]) for _, section in code_index.sections())
+        print(f"workers={workers}: index {index_elapsed:.2f} s ({functions} functions), "
+              f"models {models_elapsed:.2f} s ({len(models)} models)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import os
+import tempfile
+import time
+
+# Porównuje dotychczasowe embeddowanie po jednym chunku z paczkowaniem po tokenach i równoległymi
+# zapytaniami, na lokalnym serwerze stub. Uruchomienie: python -m benchmarks.embedding_throughput
+
+from benchmarks.stub_embedding_server import StubEmbeddingServer
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "embedding_cache.sqlite3")
+
+from langchain_community.embeddings import OpenAIEmbeddings  # noqa: E402
+
+from app import vectorstore  # noqa: E402
+from app.vectorstore import CustomOpenAIEmbeddings  # noqa: E402
+
+
+def make_texts(count: int, words: int) -> list:
+    return [f"chunk {i} " + " ".join(f"word{(i * 7 + j) % 997}" for j in range(words)) for i in range(count)]
+
+
+def run_case(label: str, server: StubEmbeddingServer, embed):
+    server.requests = server.rejected = server.inputs = 0
+    started = time.perf_counter()
+    embed()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed:8.2f}s  requests={server.requests:<5} 429s={server.rejected:<4} "
+          f"texts/s={server.inputs / elapsed:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=400)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rpm", type=int, default=3000)
+    parser.add_argument("--tpm", type=int, default=1_000_000)
+    parser.add_argument("--window", type=float, default=60, help="rate limit window in seconds")
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    server = StubEmbeddingServer(latency=args.latency, rpm=args.rpm, tpm=args.tpm, window=args.window).start()
+    texts = make_texts(args.texts, args.words)
+
+    if not args.skip_baseline:
+        baseline = OpenAIEmbeddings(openai_api_key="stub", openai_api_base=server.url)
+        run_case("one request per chunk", server, lambda: [baseline.embed_documents([text]) for text in texts])
+
+    for batch_tokens in (8000, 100000):
+        for concurrency in (1, 4):
+            vectorstore.EMBEDDING_BATCH_MAX_TOKENS = batch_tokens
+            vectorstore.EMBEDDING_CONCURRENCY = concurrency
+            embeddings = CustomOpenAIEmbeddings(openai_api_key="stub", openai_api_base=server.url)
+            run_case(f"batch<={batch_tokens} tok, x{concurrency}", server,
+                     lambda: embeddings.embed_in_batches(texts))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
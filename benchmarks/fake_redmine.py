@@ -0,0 +1,127 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+# Lokalny zamiennik API Redmine: /projects/<p>/wiki/index.json, strony z załącznikami i pobieranie
+# załączników. Rozmiary stron i opóźnienie odpowiedzi są konfigurowalne, treść jest deterministyczna.
+
+WORDS = ("faktura klient zamówienie płatność status raport użytkownik projekt termin kwota "
+         "invoice order payment user report status project deadline amount export").split()
+
+
+def generate_text(rng: random.Random, size: int) -> str:
+    blocks = []
+    length = 0
+    section = 0
+    while length < size:
+        if not blocks or rng.random() < 0.15:
+            blocks.append(f"h2. Sekcja {section}")
+            section += 1
+        paragraph = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80))).capitalize() + "."
+        blocks.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(blocks)
+
+
+class FakeRedmine(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: int = 200, page_size: int = 8000, attachments: int = 1,
+                 attachment_size: int = 4000, latency: float = 0.02, project: str = "bench", seed: int = 1):
+        super().__init__(("127.0.0.1", 0), FakeRedmineHandler)
+        self.project = project
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rng = random.Random(seed)
+        self.pages = {}
+        self.attachments = {}
+        for index in range(pages):
+            title = f"Strona_{index}"
+            page = {
+                "title": title,
+                "version": 1,
+                "created_on": "2024-01-01T00:00:00Z",
+                "updated_on": "2024-01-01T00:00:00Z",
+                "text": generate_text(self.rng, page_size),
+                "attachments": [],
+            }
+            if index:
+                page["parent"] = {"title": f"Strona_{(index - 1) // 10}"}
+            for number in range(attachments):
+                attachment_id = len(self.attachments) + 1
+                self.attachments[attachment_id] = generate_text(self.rng, attachment_size)
+                page["attachments"].append({
+                    "id": attachment_id,
+                    "filename": f"notatki_{number}.txt",
+                    "filesize": attachment_size,
+                    "digest": f"{attachment_id}-1",
+                    "created_on": "2024-01-01T00:00:00Z",
+                })
+            self.pages[title] = page
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def edit_page(self, title: str, stamp: str):
+        # Mała lokalna zmiana: jeden nowy akapit w środku strony i nowa wersja w indeksie
+        page = self.pages[title]
+        blocks = page["text"].split("\n\n")
+        blocks.insert(len(blocks) // 2, f"Poprawka {stamp}: " + " ".join(self.rng.choice(WORDS) for _ in range(30)))
+        page["text"] = "\n\n".join(blocks)
+        page["version"] += 1
+        page["updated_on"] = stamp
+
+    def index_entry(self, page: dict) -> dict:
+        entry = {key: page[key] for key in ("title", "version", "created_on", "updated_on")}
+        if "parent" in page:
+            entry["parent"] = page["parent"]
+        return entry
+
+
+class FakeRedmineHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, data: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency)
+
+        path = unquote(urlparse(self.path).path)
+        wiki_prefix = f"/projects/{server.project}/wiki/"
+        if path == f"{wiki_prefix}index.json":
+            body = {"wiki_pages": [server.index_entry(page) for page in server.pages.values()]}
+        elif path.startswith("/attachments/download/"):
+            attachment_id = int(path.split("/")[3])
+            self.send_body(server.attachments[attachment_id].encode("utf-8"), "text/plain; charset=utf-8")
+            return
+        elif path.startswith(wiki_prefix) and path.endswith(".json"):
+            page = server.pages.get(path[len(wiki_prefix):-len(".json")])
+            if page is None:
+                self.send_error(404)
+                return
+            body = {"wiki_page": {**page, "attachments": [
+                {**attachment, "content_url": f"{server.url}/attachments/download/{attachment['id']}/{attachment['filename']}"}
+                for attachment in page["attachments"]
+            ]}}
+        else:
+            self.send_error(404)
+            return
+        self.send_body(json.dumps(body).encode("utf-8"), "application/json")
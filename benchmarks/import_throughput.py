@@ -0,0 +1,112 @@
+import argparse
+import contextlib
+import io
+import os
+import resource
+import tempfile
+import time
+from collections import Counter
+
+# Mierzy WikiImporter.run od początku do końca na lokalnym zamienniku Redmine i deterministycznym
+# stubie embeddingów: pełny import, ponowny import bez zmian i import po kilku małych edycjach.
+# Uruchomienie: python -m benchmarks.import_throughput --pages 500
+
+from benchmarks.fake_redmine import FakeRedmine
+from benchmarks.stub_embedding_server import stub_embedding
+
+WORKDIR = tempfile.mkdtemp(prefix="import_bench_")
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["ATTACHMENT_CACHE_DIR"] = os.path.join(WORKDIR, "attachments")
+os.environ["IMPORT_CHECKPOINT_PATH"] = os.path.join(WORKDIR, "import_checkpoint.json")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(WORKDIR, "embedding_cache.sqlite3")
+
+import chromadb  # noqa: E402
+
+from app import wiki_importer  # noqa: E402
+from app.wiki_importer import WikiImporter  # noqa: E402
+
+
+class StubEmbeddingFunction:
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        self.texts += len(input)
+        return [stub_embedding(text) for text in input]
+
+    @staticmethod
+    def name():
+        return "benchmark-stub"
+
+
+class CountingCollection:
+    # Przepuszcza wywołania do kolekcji Chroma i liczy operacje
+    def __init__(self, collection):
+        self.collection = collection
+        self.operations = Counter()
+
+    def __getattr__(self, name):
+        self.operations[name] += 1
+        return getattr(self.collection, name)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scenario(label: str, collection: CountingCollection, embedding_function: StubEmbeddingFunction,
+                 slack_lines: list, incremental: bool = True):
+    collection.operations.clear()
+    embedding_function.calls = embedding_function.texts = 0
+    slack_lines.clear()
+    progress = type("Progress", (), {"pages_total": 0, "pages_done": 0, "chunks_embedded": 0})()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        WikiImporter(progress=progress, collection=collection).run(incremental=incremental)
+    elapsed = time.perf_counter() - started
+
+    operations = ", ".join(f"{name}={count}" for name, count in sorted(collection.operations.items()))
+    print(f"{label:<12} {elapsed:7.2f}s  pages fetched={progress.pages_done:<5} "
+          f"pages/s={progress.pages_done / elapsed:7.1f}  chunks embedded={embedding_function.texts:<6} "
+          f"chunks/s={embedding_function.texts / elapsed:7.1f}  embedding calls={embedding_function.calls:<4} "
+          f"chroma: {operations}  slack lines={len(slack_lines)}  peak RSS={peak_rss_mb():.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--page-size", type=int, default=8000, help="characters of text per page")
+    parser.add_argument("--attachments", type=int, default=1, help="text attachments per page")
+    parser.add_argument("--attachment-size", type=int, default=4000)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per Redmine request")
+    parser.add_argument("--edits", type=int, default=3, help="pages edited before the small-edit run")
+    args = parser.parse_args()
+
+    redmine = FakeRedmine(pages=args.pages, page_size=args.page_size, attachments=args.attachments,
+                          attachment_size=args.attachment_size, latency=args.latency).start()
+    os.environ["REDMINE_API_URL"] = redmine.url
+    os.environ["REDMINE_PROJECT"] = redmine.project
+
+    slack_lines = []
+    wiki_importer.send_log_to_slack = lambda message, group=None: slack_lines.append(message)
+
+    embedding_function = StubEmbeddingFunction()
+    client = chromadb.PersistentClient(path=os.path.join(WORKDIR, "chroma"))
+    collection = CountingCollection(client.get_or_create_collection("wiki", embedding_function=embedding_function))
+
+    print(f"{args.pages} pages x {args.page_size} chars, {args.attachments} attachment(s) x "
+          f"{args.attachment_size} chars, {args.latency * 1000:.0f} ms Redmine latency, workdir {WORKDIR}")
+    run_scenario("full", collection, embedding_function, slack_lines)
+    run_scenario("no-op", collection, embedding_function, slack_lines)
+    for index in range(args.edits):
+        redmine.edit_page(f"Strona_{index * max(1, args.pages // max(1, args.edits))}", f"2024-02-0{index % 9 + 1}T00:00:00Z")
+    run_scenario("small-edit", collection, embedding_function, slack_lines)
+    run_scenario("full re-read", collection, embedding_function, slack_lines, incremental=False)
+    redmine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
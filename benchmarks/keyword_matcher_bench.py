@@ -0,0 +1,58 @@
+import argparse
+import random
+import tempfile
+import time
+
+# Porównuje dawną pętlę "kw.lower() in func_code.lower()" z KeywordMatcher na treściach
+# funkcji zapisanych małymi literami z wyprzedzeniem. Uruchomienie: python -m benchmarks.keyword_matcher_bench
+
+from app.code_index import CodeIndex
+from app.keyword_matcher import KeywordMatcher
+from benchmarks.code_dump import WORDS, generate_code_dir
+
+
+def make_keywords(rng: random.Random, count: int) -> list:
+    keywords = set()
+    while len(keywords) < count:
+        keywords.add(f"{rng.choice(WORDS)}_{rng.choice(WORDS)}{rng.choice(['', '_id', 's', '_list'])}")
+    return sorted(keywords)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dumps", type=int, default=4)
+    parser.add_argument("--sections", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    code_dir = tempfile.mkdtemp(prefix="keyword_bench_")
+    generate_code_dir(code_dir, dumps=args.dumps, sections=args.sections)
+    code_index = CodeIndex(code_dir)
+    code_index.refresh()
+    functions = code_index.functions()
+    size = sum(len(function["snippet"]) for function in functions)
+    print(f"{len(functions)} functions, {size / 1e6:.1f} MB of function bodies")
+
+    rng = random.Random(1)
+    for count in (5, 20, 50, 100, 200):
+        keywords = make_keywords(rng, count)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            loop = [[kw for kw in keywords if kw.lower() in function["snippet"].lower()] for function in functions]
+        loop_time = (time.perf_counter() - started) / args.repeat
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            matcher = KeywordMatcher(keywords)
+            matched = [list(matcher.match(function["snippet_lower"])) for function in functions]
+        matcher_time = (time.perf_counter() - started) / args.repeat
+
+        assert matched == loop
+        strategy = "automaton" if matcher.transitions is not None else "str.count"
+        print(f"{count:>4} keywords  loop={loop_time * 1000:8.1f} ms  matcher={matcher_time * 1000:8.1f} ms "
+              f"({strategy}, x{loop_time / matcher_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
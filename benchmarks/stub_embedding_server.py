@@ -0,0 +1,106 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lokalny zamiennik endpointu /v1/embeddings OpenAI do benchmarków - deterministyczne wektory,
+# sztuczne opóźnienie oraz limity RPM/TPM z nagłówkami x-ratelimit-* i odpowiedzią 429
+
+
+def stub_embedding(text: str, dimensions: int = 16) -> list:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [digest[i % len(digest)] / 255 for i in range(dimensions)]
+
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.05, per_token_latency: float = 0.0,
+                 rpm: int = 3000, tpm: int = 1_000_000, window: float = 60, dimensions: int = 16):
+        super().__init__(("127.0.0.1", 0), StubEmbeddingHandler)
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window_seconds = window
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.window = deque()
+        self.requests = 0
+        self.rejected = 0
+        self.inputs = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def admit(self, tokens: int):
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0][0] > self.window_seconds:
+                self.window.popleft()
+            used_requests = len(self.window)
+            used_tokens = sum(item[1] for item in self.window)
+            reset = self.window_seconds - (now - self.window[0][0]) if self.window else 0
+            if used_requests + 1 > self.rpm or used_tokens + tokens > self.tpm:
+                self.rejected += 1
+                return False, {"retry-after": f"{max(reset, 0.01):.2f}"}
+            self.window.append((now, tokens))
+            self.requests += 1
+            return True, {
+                "x-ratelimit-limit-requests": str(self.rpm),
+                "x-ratelimit-remaining-requests": str(self.rpm - used_requests - 1),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+                "x-ratelimit-limit-tokens": str(self.tpm),
+                "x-ratelimit-remaining-tokens": str(self.tpm - used_tokens - tokens),
+                "x-ratelimit-reset-tokens": f"{reset:.3f}s",
+            }
+
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status: int, body: dict, headers: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = payload["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # Teksty albo listy tokenów (tak wysyła je OpenAIEmbeddings z langchain)
+        texts = [item if isinstance(item, str) else " ".join(map(str, item)) for item in inputs]
+        tokens = sum(len(item) // 4 + 1 if isinstance(item, str) else len(item) for item in inputs)
+
+        admitted, headers = server.admit(tokens)
+        if not admitted:
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}}, headers)
+            return
+
+        time.sleep(server.latency + tokens * server.per_token_latency)
+        with server.lock:
+            server.inputs += len(texts)
+        self.send_json(200, {
+            "object": "list",
+            "model": payload.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": stub_embedding(text, server.dimensions)}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }, headers)